@@ -1,6 +1,7 @@
 import sys
 import os
 import traceback
+from master_studio import startup
 
 def global_crash_handler(exc_type, exc_value, exc_traceback):
     if issubclass(exc_type, KeyboardInterrupt):
@@ -24,19 +25,22 @@ sys.excepthook = global_crash_handler
 
 try:
     import threading
-    from flask import Flask, request
-    from flask_cors import CORS
     from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, 
                                  QListWidget, QListWidgetItem, QStackedWidget, QFrame, QGraphicsOpacityEffect,
                                  QMessageBox, QDialog, QProgressBar, QLabel)
-    from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QThread, pyqtSignal
+    from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QThread, QTimer, pyqtSignal
     from PyQt6.QtGui import QFont, QPalette, QColor 
+    startup.mark("导入 PyQt")
     
+    # yt-dlp、Flask、requests、psutil 均在首次使用处 (或首帧之后的后台线程) 才导入，不拖慢窗口出现
     from master_studio.config import STYLE, APP_FONT_MAIN, load_settings
     from master_studio.utils import load_custom_fonts
-    from master_studio.core_worker import WorkerSignals, GlobalWorker
+    from master_studio.log_sink import setup_logging
+    from master_studio.core_worker import GlobalWorker
+    from master_studio.qt_bridge import WorkerSignals
     from master_studio.ui_components import SidebarDelegate
     from master_studio.app_pages import DownloaderView, SystemView, ToolboxView, SettingsView
+    startup.mark("导入界面模块")
 
 except ImportError as e:
     raise ImportError(f"环境缺失: {str(e)}")
@@ -111,11 +115,9 @@ class MasterApp(QMainWindow):
         
         load_custom_fonts()
         
-        self.signals = WorkerSignals()
-        self.worker = GlobalWorker(self.signals)
-        self.worker.start()
-        
-        threading.Thread(target=self.run_server, daemon=True).start()
+        self._title_pct = 0
+        self.worker = GlobalWorker()
+        self.signals = WorkerSignals(self.worker.events)
 
         main = QWidget()
         self.setCentralWidget(main)
@@ -144,7 +146,7 @@ class MasterApp(QMainWindow):
         self.content_layout.setContentsMargins(0,0,0,0)
         
         self.stack = QStackedWidget()
-        self.dl_page = DownloaderView(self.worker)
+        self.dl_page = DownloaderView(self.worker, self.signals)
         self.sys_page = SystemView()
         self.tools_page = ToolboxView()
         self.set_page = SettingsView()
@@ -157,15 +159,37 @@ class MasterApp(QMainWindow):
         self.content_layout.addWidget(self.stack)
         layout.addWidget(self.content_container)
 
-        self.signals.log.connect(self.dl_page.log_box.append)
         self.signals.progress.connect(self.update_progress)
-        self.signals.status.connect(self.dl_page.lbl_status.setText)
-        
+        self.signals.task_finished.connect(lambda task_id, url: self.update_progress(task_id, 0))
         self.sidebar.setCurrentRow(0)
+        # 事件循环开始 (首帧绘制) 后再启动后台服务；此时页面信号均已连接，恢复的历史任务能显示在队列中
+        QTimer.singleShot(0, self.start_services)
 
-    def update_progress(self, val):
-        int_val = int(val)
-        self.dl_page.pbar.setValue(int_val)
+    def start_services(self):
+        startup.mark("首帧绘制")
+        self.worker.start()
+        from master_studio.subscriptions import SubscriptionSync
+        self.subscriptions = SubscriptionSync(self.worker)
+        self.subscriptions.start()
+        threading.Thread(target=self.run_server, name="ApiServer", daemon=True).start()
+        threading.Thread(target=self.preload, name="Preload", daemon=True).start()
+        startup.report()
+
+    @staticmethod
+    def preload():
+        """ 后台预热 yt-dlp (导入约需数百毫秒)，第一个任务无需再等 """
+        try:
+            import yt_dlp
+            from master_studio.archive import archive_key
+            archive_key("https://www.youtube.com/watch?v=")
+        except Exception: pass
+
+    def update_progress(self, task_id, val):
+        self.dl_page.on_task_progress(task_id, val)
+        int_val = int(self.dl_page.overall_progress())
+        # 百分比整数未变化时不重设标题，避免无意义的窗口重绘
+        if int_val == self._title_pct: return
+        self._title_pct = int_val
         if 0 < int_val < 100:
             self.setWindowTitle(f"[{int_val}%] Master Studio Pro")
         else:
@@ -179,10 +203,11 @@ class MasterApp(QMainWindow):
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
-            if reply == QMessageBox.StandardButton.Yes: event.accept()
-            else: event.ignore()
-        else:
-            event.accept()
+            if reply != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+        self.worker.shutdown()
+        event.accept()
 
     def add_item(self, text, icon):
         item = QListWidgetItem(text)
@@ -210,19 +235,14 @@ class MasterApp(QMainWindow):
         self.anim.start()
 
     def run_server(self):
-        app = Flask(__name__)
-        CORS(app)
-        @app.route('/trigger')
-        def trigger():
-            u = request.args.get('url')
-            if u: self.worker.add_task(u); return "OK"
-            return "Err", 400
-        import logging
-        logging.getLogger('werkzeug').setLevel(logging.ERROR)
-        app.run(port=12345, debug=False, use_reloader=False)
+        from master_studio.api_server import serve
+        settings = load_settings()
+        try: serve(self.worker, settings.get("api_host", "127.0.0.1"), int(settings.get("api_port", 12345)), subscriptions=self.subscriptions)
+        except Exception as e: self.worker.log(f"❌ 本地 API 启动失败: {e}")
 
 def apply_startup_settings():
     settings = load_settings()
+    setup_logging(settings.get("log_level", "INFO"), settings.get("ytdlp_verbose", False))
     proxy = settings.get("proxy", "").strip()
     if proxy:
         os.environ["http_proxy"] = proxy
@@ -237,6 +257,7 @@ if __name__ == "__main__":
         
         app = QApplication(sys.argv)
         app.setStyle("Fusion") 
+        startup.mark("创建 QApplication")
         
         palette = QPalette()
         palette.setColor(QPalette.ColorRole.Window, QColor("#F5F5F7"))
@@ -260,6 +281,7 @@ if __name__ == "__main__":
 
         from master_studio.utils import DependencyManager
         is_ready, msg = DependencyManager.check_ffmpeg()
+        startup.mark("检查 FFmpeg")
         
         if not is_ready:
             dialog = StartupDialog()
@@ -267,6 +289,7 @@ if __name__ == "__main__":
         
         win = MasterApp()
         win.show()
+        startup.mark("构建主窗口")
         sys.exit(app.exec())
     except Exception as e:
         global_crash_handler(type(e), e, e.__traceback__)
@@ -0,0 +1,107 @@
+""" 无界面模式 (不导入 PyQt)
+
+    python -m master_studio URL [URL ...]      下载完成后退出
+    python -m master_studio -f urls.txt        从文件读取链接 (每行一个，# 开头为注释)
+    python -m master_studio --serve            常驻运行，通过本地 API 接收任务并定时同步订阅
+"""
+import argparse
+import os
+import sys
+import threading
+from master_studio.config import load_settings
+from master_studio.log_sink import setup_logging
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="master_studio", description="Master Studio Pro 下载引擎 (无界面模式)")
+    parser.add_argument("urls", nargs="*", help="要下载的链接")
+    parser.add_argument("-f", "--file", help="链接列表文件，- 表示标准输入")
+    parser.add_argument("-q", "--quality", type=int, default=0, help="画质序号，与界面下拉框一致 (默认 0)")
+    parser.add_argument("--sub-lang", type=int, default=0, help="字幕语言序号 (默认 0)")
+    parser.add_argument("--no-subs", action="store_true", help="不下载/烧录字幕")
+    parser.add_argument("--no-cover", action="store_true", help="不保存封面")
+    parser.add_argument("-p", "--playlist", action="store_true", help="展开播放列表/频道，下载其中全部视频 (已下载的跳过)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="并发下载数 (默认取设置中的 max_concurrent)")
+    parser.add_argument("--serve", action="store_true", help="启动本地 API 并常驻运行")
+    parser.add_argument("--host", default=None, help="API 监听地址 (默认取设置中的 api_host)")
+    parser.add_argument("--port", type=int, default=None, help="API 端口 (默认取设置中的 api_port)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出调试日志")
+    return parser.parse_args(argv)
+
+def read_urls(args):
+    urls = list(args.urls)
+    if args.file:
+        f = sys.stdin if args.file == "-" else open(args.file, 'r', encoding='utf-8')
+        with f: urls += [l.strip() for l in f if l.strip() and not l.lstrip().startswith("#")]
+    return urls
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = load_settings()
+    setup_logging("DEBUG" if args.verbose else settings.get("log_level", "INFO"),
+                  settings.get("ytdlp_verbose", False), console=True)
+    proxy = settings.get("proxy", "").strip()
+    if proxy:
+        os.environ["http_proxy"] = proxy
+        os.environ["https_proxy"] = proxy
+
+    urls = read_urls(args)
+    if not urls and not args.serve:
+        print("未提供链接；使用 --serve 启动本地 API，或传入链接 / -f 文件", file=sys.stderr)
+        return 2
+
+    from master_studio.core_worker import GlobalWorker
+    worker = GlobalWorker(max_workers=args.workers)
+
+    tracked, waiting, failed = set(), set(), []
+    lock = threading.RLock() # add_tasks 会在持锁的同一线程里同步回调 on_event
+    all_done = threading.Event()
+
+    def on_event(event, data):
+        if event == 'task_queued':
+            # 播放列表展开出的子任务也要等它们完成
+            with lock:
+                if data.get('parent') in tracked:
+                    tracked.add(data['task_id'])
+                    waiting.add(data['task_id'])
+            return
+        if event != 'task_finished': return
+        with lock:
+            if data['task_id'] not in waiting: return
+            waiting.discard(data['task_id'])
+            if not data.get('ok'): failed.append(data['url'])
+            if not waiting: all_done.set()
+
+    worker.events.listen(on_event)
+    worker.start()
+    if urls:
+        options = {'quality_idx': args.quality, 'sub_lang_idx': args.sub_lang,
+                   'embed_sub': not args.no_subs, 'save_cover': not args.no_cover, 'playlist': args.playlist}
+        with lock:
+            ids = worker.add_tasks([dict(options, url=u) for u in urls])
+            tracked.update(ids)
+            waiting.update(ids)
+
+    try:
+        if args.serve:
+            from master_studio.api_server import serve
+            from master_studio.subscriptions import SubscriptionSync
+            # 常驻模式下同时按间隔检查订阅源
+            subscriptions = SubscriptionSync(worker, settings=settings)
+            subscriptions.start()
+            serve(worker, args.host or settings.get("api_host", "127.0.0.1"), args.port or int(settings.get("api_port", 12345)),
+                  subscriptions=subscriptions)
+            return 0
+        # 带超时循环等待，Ctrl+C 才能及时生效
+        while not all_done.wait(0.5): pass
+    except KeyboardInterrupt:
+        print("已中断，未完成的任务下次启动时自动恢复", file=sys.stderr)
+        return 130
+    finally:
+        worker.shutdown()
+
+    print(f"完成 {len(tracked) - len(failed)}/{len(tracked)}", file=sys.stderr)
+    for url in failed: print(f"失败: {url}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import hmac
+import json
+import logging
+import os
+import secrets
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask_cors import CORS
+from master_studio.config import TOKEN_FILE
+
+logger = logging.getLogger(__name__)
+
+# 允许外部调用方逐任务覆盖的参数，其余字段 (task_id、host 等) 由 worker 生成
+TASK_FIELDS = {
+    'url': str, 'quality_idx': int, 'sub_lang_idx': int,
+    'save_cover': bool, 'embed_sub': bool, 'save_sub_file': bool, 'playlist': bool,
+}
+MAX_BATCH = 1000
+SSE_HEARTBEAT = 15 # 秒；空闲时发送注释行，防止代理或浏览器断开长连接
+
+def parse_task(item, require_url=True):
+    """ 校验单个任务: 字符串视为 URL，对象只保留 TASK_FIELDS 中的键；不合法时抛 ValueError """
+    if isinstance(item, str): item = {'url': item}
+    if not isinstance(item, dict): raise ValueError("任务必须是 URL 字符串或对象")
+    task = {}
+    for key, kind in TASK_FIELDS.items():
+        if key not in item: continue
+        value = item[key]
+        # bool 是 int 的子类，需单独排除 True/False 冒充画质序号
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise ValueError(f"{key} 类型应为 {kind.__name__}")
+        task[key] = value
+    if not require_url: return task
+    url = task.get('url', '').strip()
+    if not url.startswith(("http://", "https://")): raise ValueError("url 无效")
+    task['url'] = url
+    return task
+
+def load_token(path=TOKEN_FILE):
+    """ 读取本地 API 令牌，首次运行时随机生成并写入 data/token.txt """
+    try:
+        with open(path, 'r', encoding='utf-8') as f: token = f.read().strip()
+        if token: return token
+    except OSError: pass
+    token = secrets.token_urlsafe(32)
+    with open(path, 'w', encoding='utf-8') as f: f.write(token)
+    try: os.chmod(path, 0o600)
+    except OSError: pass
+    return token
+
+def create_app(worker, subscriptions=None, token=None):
+    """ /trigger 保持旧版浏览器插件的无令牌、跨域访问；其余接口能读到下载记录与本地路径，
+    只允许同源访问，并要求 Authorization: Bearer <令牌> (EventSource 无法设置请求头，可用 ?token=) """
+    app = Flask(__name__)
+    CORS(app, resources={r"/trigger": {"origins": "*"}})
+    token = token or load_token()
+
+    @app.before_request
+    def check_token():
+        if request.endpoint in (None, 'trigger') or request.method == 'OPTIONS': return None
+        auth = request.headers.get('Authorization', '')
+        given = auth[7:] if auth.startswith('Bearer ') else request.args.get('token', '')
+        if not hmac.compare_digest(given.encode(), token.encode()):
+            return jsonify(error="缺少或错误的 API 令牌"), 401
+        return None
+
+    @app.route('/trigger')
+    def trigger():
+        """ 兼容旧版浏览器插件: GET /trigger?url=... """
+        u = request.args.get('url')
+        if u: worker.add_task(u); return "OK"
+        return "Err", 400
+
+    @app.route('/tasks', methods=['POST'])
+    def create_tasks():
+        """ 批量入队，接受 [任务, ...] 或 {"tasks": [...], "defaults": {...}}
+        任务可以是 URL 字符串或带 quality_idx / sub_lang_idx 等选项的对象 """
+        body = request.get_json(silent=True)
+        defaults = {}
+        if isinstance(body, dict):
+            defaults = body.get('defaults') or {}
+            body = body.get('tasks', [body] if 'url' in body else None)
+        if not isinstance(body, list) or not isinstance(defaults, dict):
+            return jsonify(error="请求体应为任务数组"), 400
+        if len(body) > MAX_BATCH:
+            return jsonify(error=f"单次最多提交 {MAX_BATCH} 个任务"), 413
+        try:
+            base = parse_task(defaults, require_url=False)
+            base.pop('url', None)
+            tasks = []
+            for i, item in enumerate(body):
+                try: tasks.append({**base, **parse_task(item)})
+                except ValueError as e: raise ValueError(f"第 {i} 项: {e}")
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(task_ids=worker.add_tasks(tasks)), 202
+
+    @app.route('/tasks')
+    def list_tasks():
+        """ GET /tasks?status=running&limit=50&offset=0 """
+        status = request.args.get('status') or None
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        tasks = [_with_progress(worker, t) for t in worker.store.list_tasks(status, limit, offset)]
+        return jsonify(tasks=tasks, counts=worker.store.counts())
+
+    @app.route('/tasks/<task_id>')
+    def get_task(task_id):
+        task = worker.store.get(task_id)
+        if not task: return jsonify(error="任务不存在"), 404
+        return jsonify(_with_progress(worker, task))
+
+    @app.route('/tasks/<task_id>', methods=['DELETE'])
+    def cancel_task(task_id):
+        """ 取消排队或运行中的任务 (编码中的 ffmpeg 会被立即终止)；任务最终以 failed / 已取消 结束 """
+        task = worker.store.get(task_id)
+        if not task: return jsonify(error="任务不存在"), 404
+        if not worker.cancel(task_id): return jsonify(error="任务已结束", status=task['status']), 409
+        return jsonify(ok=True), 202
+
+    @app.route('/subscriptions')
+    def list_subscriptions():
+        if not subscriptions: return jsonify(error="订阅同步未启用"), 404
+        subs = subscriptions.store.list()
+        # 已见条目列表仅供内部比对，接口只返回数量
+        for sub in subs: sub['seen'] = len(sub['seen'])
+        return jsonify(subscriptions=subs)
+
+    @app.route('/subscriptions', methods=['POST'])
+    def add_subscription():
+        """ {"url": 频道或播放列表, "interval_min": 检查间隔, 以及 quality_idx 等任务选项} """
+        if not subscriptions: return jsonify(error="订阅同步未启用"), 404
+        body = request.get_json(silent=True)
+        interval = body.get('interval_min') if isinstance(body, dict) else None
+        if interval is not None and (not isinstance(interval, int) or isinstance(interval, bool) or interval < 1):
+            return jsonify(error="interval_min 应为正整数"), 400
+        try: task = parse_task(body)
+        except ValueError as e: return jsonify(error=str(e)), 400
+        url = task.pop('url')
+        task.pop('playlist', None)
+        sub = subscriptions.add(url, task, interval)
+        sub['seen'] = len(sub['seen'])
+        return jsonify(sub), 201
+
+    @app.route('/subscriptions/<sub_id>', methods=['DELETE'])
+    def remove_subscription(sub_id):
+        if not subscriptions or not subscriptions.store.remove(sub_id): return jsonify(error="订阅不存在"), 404
+        return "", 204
+
+    @app.route('/subscriptions/<sub_id>/sync', methods=['POST'])
+    def sync_subscription(sub_id):
+        if not subscriptions or not subscriptions.store.get(sub_id): return jsonify(error="订阅不存在"), 404
+        subscriptions.sync_now(sub_id)
+        return jsonify(ok=True), 202
+
+    @app.route('/events')
+    def events():
+        """ Server-Sent Events: 推送与界面信号相同的 task_queued / task_started / status / progress / task_finished
+        ?task_id=... 只订阅单个任务 """
+        only = request.args.get('task_id')
+        sub = worker.events.subscribe()
+
+        def stream():
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    item = sub.get(timeout=SSE_HEARTBEAT)
+                    if item is None:
+                        yield ": ping\n\n"
+                        continue
+                    event, data = item
+                    if only and data.get('task_id') != only: continue
+                    yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            finally:
+                # 客户端断开时生成器被关闭，及时退订，避免队列堆积
+                worker.events.unsubscribe(sub)
+
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        return Response(stream_with_context(stream()), mimetype='text/event-stream', headers=headers)
+
+    return app
+
+def _with_progress(worker, task):
+    """ 运行中的任务附带实时进度 (来自内存，不写库) """
+    task['progress'] = 100.0 if task['status'] == "done" else worker.progress.percent(task['id'])
+    return task
+
+def serve(worker, host="127.0.0.1", port=12345, threads=16, subscriptions=None):
+    """ 阻塞运行本地 API。优先使用 waitress (生产级多线程 WSGI 服务器)，
+    未安装时退回 werkzeug 的多线程服务器，而不是单线程的开发模式。每条 SSE 连接常驻一个线程，线程数需留余量 """
+    app = create_app(worker, subscriptions)
+    logger.info("API 令牌保存在 %s", TOKEN_FILE)
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server(host, port, app, threaded=True)
+        logger.info("API 已启动 (werkzeug): http://%s:%s", host, port)
+        server.serve_forever()
+        return
+    logger.info("API 已启动 (waitress): http://%s:%s", host, port)
+    waitress_serve(app, host=host, port=port, threads=threads, ident="MasterStudio")
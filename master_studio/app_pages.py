@@ -1,5 +1,4 @@
 import os
-import psutil
 import subprocess
 import time
 import webbrowser
@@ -7,7 +6,7 @@ import threading
 import json
 import uuid
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, 
-                             QTextEdit, QFrame, QGridLayout, QPushButton, QMessageBox, 
+                             QFrame, QGridLayout, QPushButton, QMessageBox, 
                              QComboBox, QListView, QCheckBox, QFileDialog, QListWidget, 
                              QListWidgetItem, QDialog, QMenu, QGraphicsDropShadowEffect)
 from PyQt6.QtGui import QFont, QColor, QIcon, QAction, QCursor
@@ -15,7 +14,7 @@ from PyQt6.QtCore import Qt, QTimer, QSize, QThread, pyqtSignal
 
 from master_studio.config import STYLE, APP_FONT_MAIN, APP_FONT_MONO, TOOLS_DIR, TOOLS_CONFIG_FILE, ICON_DIR, load_settings, save_settings
 import master_studio.config as config_module
-from master_studio.ui_components import MacCard, MacInput, MacButton, get_recolored_icon, SmoothScrollArea
+from master_studio.ui_components import MacCard, MacInput, MacButton, get_recolored_icon, SmoothScrollArea, TaskProgressRow, LogView
 
 # 通用 ComboBox 样式 (优化下拉菜单)
 def apply_combo_style(combo, height=40):
@@ -179,9 +178,10 @@ class AddToolDialog(QDialog):
 
 # --- 1. 下载页 ---
 class DownloaderView(ToolPage):
-    def __init__(self, worker):
+    def __init__(self, worker, signals):
         super().__init__("下载中心", "支持 YouTube / Bilibili 高速下载")
         self.worker = worker
+        self.signals = signals
         
         # 1. 主操作卡片
         card = MacCard()
@@ -239,6 +239,8 @@ class DownloaderView(ToolPage):
         self.chk_embed_sub.setChecked(True)
         self.chk_save_sub = QCheckBox("字幕文件") 
         self.chk_save_sub.setChecked(False)
+        self.chk_playlist = QCheckBox("整个列表/频道")
+        self.chk_playlist.setToolTip("展开播放列表或频道中的全部视频并发下载，已下载过的自动跳过")
         
         lbl_lang = QLabel("字幕:")
         lbl_lang.setStyleSheet(f"color: {STYLE['text_sub']}; font-size: 13px; border: none;")
@@ -252,6 +254,8 @@ class DownloaderView(ToolPage):
         opts_layout.addWidget(self.chk_embed_sub)
         opts_layout.addSpacing(16)
         opts_layout.addWidget(self.chk_save_sub)
+        opts_layout.addSpacing(16)
+        opts_layout.addWidget(self.chk_playlist)
         opts_layout.addStretch() 
         opts_layout.addWidget(lbl_lang)
         opts_layout.addWidget(self.combo_sub_lang)
@@ -292,12 +296,12 @@ class DownloaderView(ToolPage):
         split_layout = QHBoxLayout()
         split_layout.setSpacing(20)
         
-        self.log_box = QTextEdit()
+        self.log_box = LogView(self.worker.log_sink)
         self.log_box.setFrameShape(QFrame.Shape.NoFrame)
         self.log_box.setReadOnly(True)
         self.log_box.setPlaceholderText("任务运行日志...")
         self.log_box.setStyleSheet(f"""
-            QTextEdit {{ 
+            QPlainTextEdit {{ 
                 background-color: #FFFFFF; 
                 border: 1px solid {STYLE['border']}; 
                 border-radius: 12px; 
@@ -314,7 +318,7 @@ class DownloaderView(ToolPage):
         qc_layout.setContentsMargins(0,0,0,0)
         qc_layout.setSpacing(8)
         
-        q_label = QLabel("等待队列")
+        q_label = QLabel("任务队列")
         q_label.setStyleSheet(f"font-weight: 600; font-size: 12px; color: {STYLE['text_sub']};")
         qc_layout.addWidget(q_label)
         
@@ -328,40 +332,110 @@ class DownloaderView(ToolPage):
                 padding: 8px; 
             }} 
             QListWidget::item {{ 
-                height: 28px; 
                 color: {STYLE['text_main']}; 
                 padding-left: 4px;
             }}
         """)
+        self.queue_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.queue_list.customContextMenuRequested.connect(self.show_task_menu)
         qc_layout.addWidget(self.queue_list)
+        # task_id -> (QListWidgetItem, TaskProgressRow)；排队中的任务只是纯文本项 (控件为 None)，
+        # 开始运行才创建进度控件，展开上千条的频道时界面开销只与并发数有关
+        self.task_rows = {}
+        self.running = set()
         
         split_layout.addWidget(self.log_box, 7)
         split_layout.addWidget(queue_container, 3)
         self.content_area.addLayout(split_layout)
         
-        self.worker.signals.task_started.connect(self.on_task_start)
-        self.worker.signals.task_finished.connect(self.on_task_finish)
+        self.signals.task_queued.connect(self.on_task_queued)
+        self.signals.task_started.connect(self.on_task_start)
+        self.signals.task_finished.connect(self.on_task_finish)
+        self.signals.status.connect(self.on_task_status)
 
     def start(self):
         url = self.input.text().strip()
         if url:
-            params = {'url': url, 'quality_idx': self.combo_quality.currentIndex(), 'save_cover': self.chk_thumbnail.isChecked(), 'embed_sub': self.chk_embed_sub.isChecked(), 'save_sub_file': self.chk_save_sub.isChecked(), 'sub_lang_idx': self.combo_sub_lang.currentIndex()}
-            self.queue_list.addItem(QListWidgetItem(f"⏳ {url[:25]}..."))
+            params = {'url': url, 'quality_idx': self.combo_quality.currentIndex(), 'save_cover': self.chk_thumbnail.isChecked(), 'embed_sub': self.chk_embed_sub.isChecked(), 'save_sub_file': self.chk_save_sub.isChecked(), 'sub_lang_idx': self.combo_sub_lang.currentIndex(), 'playlist': self.chk_playlist.isChecked()}
             self.btn.setEnabled(False)
             self.btn.setText("提交中")
             QTimer.singleShot(800, lambda: self.reset_btn())
             self.worker.add_task(params)
             self.input.clear()
-            self.log_box.append(f"▶️ 已提交: {url[:30]}...")
+            self.worker.log(f"▶️ 已提交: {url[:30]}...")
+
+    def add_item(self, task_id, url):
+        if task_id not in self.task_rows:
+            item = QListWidgetItem(f"⏳ {url[:40]}")
+            self.queue_list.addItem(item)
+            self.task_rows[task_id] = (item, None)
+        return self.task_rows[task_id][0]
+
+    def get_row(self, task_id, url):
+        item = self.add_item(task_id, url)
+        row = self.task_rows[task_id][1]
+        if row is None:
+            row = TaskProgressRow(url)
+            item.setText("")
+            item.setSizeHint(row.sizeHint())
+            self.queue_list.setItemWidget(item, row)
+            self.task_rows[task_id] = (item, row)
+        return row
+
+    def on_task_queued(self, task_id, url):
+        self.add_item(task_id, url)
 
-    def on_task_start(self, url):
-        if self.queue_list.count() > 0: self.queue_list.takeItem(0)
-        self.lbl_status.setText(f"正在下载: {url[:30]}...")
+    def show_task_menu(self, pos):
+        item = self.queue_list.itemAt(pos)
+        task_id = next((t for t, (it, _) in self.task_rows.items() if it is item), None)
+        if not task_id: return
+        menu = QMenu(self.queue_list)
+        menu.setStyleSheet(f"""
+            QMenu {{ background-color: #FFFFFF; border: 1px solid {STYLE['border']}; border-radius: 8px; padding: 4px; }}
+            QMenu::item {{ padding: 6px 24px; font-family: "{APP_FONT_MAIN}"; font-size: 13px; color: {STYLE['text_main']}; border-radius: 4px; }}
+            QMenu::item:selected {{ background-color: {STYLE['accent']}; color: #FFFFFF; }}
+        """)
+        act_cancel = QAction("⛔ 取消任务", self.queue_list)
+        act_cancel.triggered.connect(lambda: self.worker.cancel(task_id))
+        menu.addAction(act_cancel)
+        menu.exec(self.queue_list.viewport().mapToGlobal(pos))
+
+    def on_task_start(self, task_id, url):
+        self.running.add(task_id)
+        self.get_row(task_id, url).set_running()
+        self.refresh_summary(f"正在下载: {url[:30]}...")
         self.lbl_status_icon.setStyleSheet("color: #F59E0B; font-size: 8px;") # Amber 500
 
-    def on_task_finish(self, url):
-        self.lbl_status.setText("系统空闲")
-        self.lbl_status_icon.setStyleSheet(f"color: {STYLE['accent']}; font-size: 8px;")
+    def on_task_progress(self, task_id, val):
+        row = self.task_rows.get(task_id, (None, None))[1]
+        if row: row.set_progress(val)
+        self.pbar.setValue(int(self.overall_progress()))
+
+    def on_task_status(self, task_id, text):
+        row = self.task_rows.get(task_id, (None, None))[1]
+        if row: row.set_status(text)
+        if len(self.running) == 1: self.lbl_status.setText(text)
+
+    def on_task_finish(self, task_id, url):
+        self.running.discard(task_id)
+        if task_id in self.task_rows:
+            item, _ = self.task_rows.pop(task_id)
+            self.queue_list.takeItem(self.queue_list.row(item))
+        if self.running:
+            self.refresh_summary()
+        else:
+            self.lbl_status.setText("系统空闲")
+            self.lbl_status_icon.setStyleSheet(f"color: {STYLE['accent']}; font-size: 8px;")
+        self.pbar.setValue(int(self.overall_progress()))
+
+    def overall_progress(self):
+        """ 所有运行中任务的平均进度 """
+        vals = [self.task_rows[t][1].value for t in self.running if self.task_rows.get(t, (None, None))[1]]
+        return sum(vals) / len(vals) if vals else 0
+
+    def refresh_summary(self, single_text=None):
+        if len(self.running) > 1: self.lbl_status.setText(f"并发下载中: {len(self.running)} 个任务")
+        elif single_text: self.lbl_status.setText(single_text)
 
     def reset_btn(self):
         self.btn.setEnabled(True)
@@ -371,6 +445,7 @@ class DownloaderView(ToolPage):
 class SystemMonitorWorker(QThread):
     stats_updated = pyqtSignal(float, float) 
     def run(self):
+        import psutil # 只有系统监控页用到，在线程内导入
         while True:
             try:
                 cpu = psutil.cpu_percent(interval=1)
@@ -743,6 +818,19 @@ class SettingsView(ToolPage):
         row_proxy.addWidget(self.input_proxy)
         layout.addLayout(row_proxy)
         
+        layout.addSpacing(24)
+        
+        row_pool = self.create_row("并发下载", "同时进行的下载任务数 (重启后生效)")
+        self.combo_pool = QComboBox()
+        self.combo_pool.addItems([str(i) for i in range(1, 9)])
+        self.combo_pool.setFixedWidth(120)
+        apply_combo_style(self.combo_pool)
+        try: pool_size = int(self.settings.get("max_concurrent", 3))
+        except (TypeError, ValueError): pool_size = 3
+        self.combo_pool.setCurrentIndex(min(max(pool_size, 1), 8) - 1)
+        row_pool.addWidget(self.combo_pool)
+        layout.addLayout(row_pool)
+        
         layout.addStretch()
         
         btn_row = QHBoxLayout()
@@ -772,8 +860,11 @@ class SettingsView(ToolPage):
         if d: self.input_path.setText(d)
         
     def save_all(self):
-        new_settings = {"download_dir": self.input_path.text(),"proxy": self.input_proxy.text().strip(),"theme": "light"}
+        # 合并保存，避免覆盖 settings.json 中界面未暴露的高级选项
+        new_settings = dict(self.settings)
+        new_settings.update({"download_dir": self.input_path.text(),"proxy": self.input_proxy.text().strip(),"theme": "light","max_concurrent": self.combo_pool.currentIndex() + 1})
         if save_settings(new_settings):
+            self.settings = new_settings
             config_module.DOWNLOAD_DIR = new_settings["download_dir"]
             p = new_settings["proxy"]
             if p:
@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+from master_studio.config import DB_FILE, ARCHIVE_FILE
+from master_studio.storage import open_db
+
+class DownloadArchive:
+    """ 基于 SQLite 主键索引的下载记录，O(1) 查询
+    实现了 yt-dlp 所需的 `in` / add() 接口，可直接作为 download_archive 参数传入 """
+    def __init__(self, path=DB_FILE, legacy_file=ARCHIVE_FILE):
+        self.conn = open_db(path)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS archive (key TEXT PRIMARY KEY, added_at REAL) WITHOUT ROWID")
+        self._import_legacy(legacy_file)
+
+    def _import_legacy(self, legacy_file):
+        """ 一次性迁移旧版 archive.txt，迁移后改名保留备份 """
+        if not legacy_file or not os.path.exists(legacy_file): return
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            keys = [(line.strip(), time.time()) for line in f if line.strip()]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO archive (key, added_at) VALUES (?, ?)", keys)
+        os.replace(legacy_file, legacy_file + ".migrated")
+
+    def __contains__(self, key):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM archive WHERE key = ?", (key,)).fetchone() is not None
+
+    def __bool__(self):
+        # yt-dlp 以 `if not self.archive` 判断是否启用记录，这里避免触发 COUNT(*) 全表扫描
+        return True
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def add(self, key):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO archive (key, added_at) VALUES (?, ?)", (key, time.time()))
+
+_IE_CLASSES = None
+
+def entry_key(entry):
+    """ 平铺解析 (extract_flat) 条目的记录键，有 ie_key (已解析条目为 extractor_key) 与 id 时无需匹配提取器 """
+    url = entry.get('url') or entry.get('webpage_url')
+    ie_key = entry.get('ie_key') or entry.get('extractor_key')
+    if ie_key and entry.get('id'): return f"{ie_key.lower()} {entry['id']}"
+    return archive_key(url) if url else None
+
+def archive_key(url):
+    """ 不发起网络请求，仅凭 URL 推算 yt-dlp 的记录键 ("<extractor> <id>")，无法判断时返回 None """
+    global _IE_CLASSES
+    if _IE_CLASSES is None:
+        from yt_dlp.extractor import gen_extractor_classes
+        _IE_CLASSES = list(gen_extractor_classes())
+    for ie in _IE_CLASSES:
+        if not ie.suitable(url): continue
+        if ie.ie_key() == 'Generic': return None
+        temp_id = ie.get_temp_id(url)
+        return f"{ie.ie_key().lower()} {temp_id}" if temp_id else None
+    return None
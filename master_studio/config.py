@@ -1,7 +1,6 @@
 import os
 import sys
 import json
-from PyQt6.QtGui import QColor
 
 # --- 1. 核心路径适配 ---
 # 保持原有的打包/开发环境判断逻辑，确保稳定性
@@ -27,6 +26,7 @@ FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
 # 关键文件路径
 YTDLP_EXE = os.path.join(BIN_DIR, "yt-dlp.exe")
 FFMPEG_EXE = os.path.join(BIN_DIR, "ffmpeg.exe")
+FFPROBE_EXE = os.path.join(BIN_DIR, "ffprobe.exe")
 DB_FILE = os.path.join(DATA_DIR, "downloads.db")
 LOG_FILE = os.path.join(LOGS_DIR, "app.log")
 TOKEN_FILE = os.path.join(DATA_DIR, "token.txt")
@@ -47,7 +47,33 @@ def load_settings():
     defaults = {
         "download_dir": DEFAULT_DOWNLOAD_DIR,
         "proxy": "",
-        "theme": "light"
+        "theme": "light",
+        "max_concurrent": 3, # 并发下载槽位数 (重启生效)
+        "extract_workers": 2, # 并发解析槽位数，提前解析元数据供下载槽位使用
+        "encode_workers": 0, # 并发 ffmpeg 编码数，0 为按 CPU 核数自动
+        "video_encoder": "auto", # auto / libx264 / h264_nvenc / h264_qsv / h264_amf
+        "x264_preset": "veryfast", # libx264 速度预设，越快画质越低
+        "x264_crf": 23,
+        "nvenc_preset": "p7",
+        "hw_cq": 19, # 硬件编码器的恒定质量参数
+        "encode_threads": 0, # 单个编码的线程数，0 为自动
+        "segment_burn_min_sec": 1800, # 超过该时长的视频按关键帧切段并行烧录，0 为关闭
+        "per_host_limit": 2, # 同一站点最大并发下载数 (解析只受 host_requests_per_sec 限频)
+        "host_requests_per_sec": 1.0, # 单站点解析请求频率上限
+        "rate_limit_kbps": 0, # 总下载带宽上限 (KB/s)，0 为不限
+        "progress_fps": 8, # 每个任务每秒最多刷新界面次数
+        "log_max_lines": 2000, # 日志窗口保留的最大行数
+        "subscription_interval_min": 60, # 订阅源默认检查间隔 (分钟)
+        "subscription_page_size": 30, # 每次检查只看第一页的条目数
+        "api_host": "127.0.0.1", # 本地 API 监听地址 (浏览器插件 / 脚本推送任务)
+        "api_port": 12345,
+        "log_level": "INFO", # logs/app.log 记录级别: DEBUG / INFO / WARNING / ERROR
+        "ytdlp_verbose": False, # 是否记录 yt-dlp 详细调试输出
+        "max_attempts": 3, # 任务因崩溃中断的最大重试次数
+        "cookie_browser": "edge", # 读取 Cookie 的浏览器，留空则始终使用游客模式
+        "cookie_ttl_min": 30, # Cookie 快照刷新周期 (分钟)
+        "cookie_domains": ["youtube.com", "google.com", "bilibili.com"], # 快照只保留这些站点 (含子域) 的 Cookie
+        "ffmpeg_stream_install": False, # 安装 FFmpeg 时只按 Range 流式取出所需文件 (省流量，但不做 SHA-256 校验)
     }
     if os.path.exists(SETTINGS_FILE):
         try:
@@ -91,7 +117,7 @@ STYLE = {
     "border": "#E5E7EB",          # 极淡的边框 (Cool Gray 200)
     
     # 装饰性元素
-    "shadow": QColor(0, 0, 0, 10), # 基础阴影颜色，透明度更低更细腻
+    "shadow": "#0A000000", # 基础阴影颜色 (#AARRGGBB，QColor 可直接解析)，透明度更低更细腻
     
     # 尺寸与圆角系统 (8px Grid)
     "radius_l": 16,               # 卡片大圆角
@@ -103,3 +129,5 @@ STYLE = {
 # 优先寻找 Inter，其次是 Win11 的 Segoe UI Variable，最后回退到 微软雅黑
 APP_FONT_MAIN = "Inter, Segoe UI Variable Display, Microsoft YaHei UI, sans-serif"
 APP_FONT_MONO = "JetBrains Mono, Cascadia Code, Consolas, monospace"
+# 随程序分发、需要注册的字体文件；Segoe UI 为系统自带，不再加载 assets 中的副本
+APP_FONT_FILES = ["Inter-Regular.ttf", "Inter-Medium.ttf", "Inter-SemiBold.ttf", "Inter-Bold.ttf", "CascadiaCode.ttf"]
@@ -0,0 +1,95 @@
+import glob
+import logging
+import os
+import threading
+import time
+from master_studio.config import DATA_DIR
+
+COOKIE_DIR = os.path.join(DATA_DIR, "cookies")
+# 快照只保留下载所需站点的 Cookie (含子域)，银行、邮箱等其他站点的登录态不会落盘
+COOKIE_DOMAINS = ("youtube.com", "google.com", "bilibili.com")
+
+logger = logging.getLogger(__name__)
+
+class BrowserCookieProvider:
+    """ 后台定期把浏览器 Cookie 解密并快照为 Netscape 格式文件 (data/cookies/<浏览器>-<时间戳>.txt，明文，仅含 domains 内的站点)
+    下载任务只读取快照 (cookiefile)，不再逐个任务打开被浏览器锁定的 Cookie 数据库 """
+    def __init__(self, browser="edge", ttl=1800, folder=COOKIE_DIR, domains=COOKIE_DOMAINS):
+        self.browser = browser
+        self.domains = tuple(d.lower().lstrip(".") for d in domains)
+        self.ttl = max(60, ttl)
+        self.folder = folder
+        self._path = None
+        self._stamp = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._adopt_existing()
+
+    def _adopt_existing(self):
+        """ 沿用上次运行留下、仍在有效期内的快照，启动后第一个任务即可使用 """
+        files = sorted(glob.glob(os.path.join(self.folder, f"{self.browser}-*.txt")), key=os.path.getmtime)
+        if files and time.time() - os.path.getmtime(files[-1]) < self.ttl:
+            self._path, self._stamp = files[-1], os.path.getmtime(files[-1])
+            self._ready.set()
+
+    def start(self):
+        if self._thread or not self.browser: return
+        self._thread = threading.Thread(target=self._loop, name="CookieRefresher", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            if time.time() - self._stamp >= self.ttl: self.refresh()
+            self._ready.set()
+            # 到期或被 request_refresh() 唤醒时再刷新
+            self._wake.wait(max(1, self.ttl - (time.time() - self._stamp)))
+            if self._wake.is_set():
+                self._wake.clear()
+                self._stamp = 0
+
+    def refresh(self):
+        """ 读取浏览器 Cookie；失败 (如数据库被锁) 时保留旧快照，稍后重试 """
+        from yt_dlp.cookies import extract_cookies_from_browser, YoutubeDLCookieJar
+        try:
+            jar = extract_cookies_from_browser(self.browser)
+            kept = YoutubeDLCookieJar()
+            for cookie in jar:
+                if self._wanted(cookie.domain): kept.set_cookie(cookie)
+            if not os.path.exists(self.folder): os.makedirs(self.folder)
+            # 文件名带时间戳: YdlPool 以参数为键，新快照自然对应新的 YoutubeDL 实例
+            path = os.path.join(self.folder, f"{self.browser}-{int(time.time() * 1000)}.txt")
+            kept.save(path, ignore_discard=True, ignore_expires=True)
+            # 仅对 POSIX 生效；Windows 下依赖用户目录本身的 ACL
+            try: os.chmod(path, 0o600)
+            except OSError: pass
+            with self._lock:
+                old, self._path, self._stamp = self._path, path, time.time()
+            self._cleanup(keep={path, old})
+            return True
+        except Exception as e:
+            logger.warning("刷新 %s Cookies 失败: %s", self.browser, e)
+            # 失败后缩短重试间隔，不必等满一个 TTL
+            self._stamp = time.time() - self.ttl + 60
+            return False
+
+    def _wanted(self, domain):
+        domain = (domain or "").lower().lstrip(".")
+        return any(domain == d or domain.endswith("." + d) for d in self.domains)
+
+    def _cleanup(self, keep):
+        for f in glob.glob(os.path.join(self.folder, f"{self.browser}-*.txt")):
+            if f not in keep:
+                try: os.remove(f)
+                except OSError: pass
+
+    def current(self, timeout=10):
+        """ 返回当前快照路径；仅在首次快照尚未完成时最多等待 timeout 秒，无可用快照返回 None """
+        if not self.browser: return None
+        self._ready.wait(timeout)
+        with self._lock: return self._path
+
+    def request_refresh(self):
+        """ 站点拒绝当前 Cookie 时调用，后台立即重新读取 """
+        self._wake.set()
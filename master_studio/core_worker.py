@@ -1,134 +1,378 @@
 import threading
-import queue
+import logging
 import os
-import subprocess
 import sys
 import traceback
-import yt_dlp
-from PyQt6.QtCore import QObject, pyqtSignal
-from master_studio.config import DOWNLOAD_DIR, BIN_DIR, ARCHIVE_FILE, FFMPEG_EXE
+import uuid
+from collections import deque
+from functools import partial
+from master_studio.config import DOWNLOAD_DIR, BIN_DIR, load_settings
+from master_studio.archive import DownloadArchive, archive_key, entry_key
+from master_studio.scheduler import DownloadScheduler, host_key, retry_backoff
+from master_studio.storage import TaskStore
+from master_studio.ydl_pool import YdlPool
+from master_studio.cookie_provider import COOKIE_DOMAINS, BrowserCookieProvider
+from master_studio.post_process import PostProcessPool, EncodeCancelled
+from master_studio.progress import ProgressTracker
+from master_studio.log_sink import LogSink
+from master_studio.events import EventBus, EVENT_FIELDS
+from master_studio.results import DownloadResult
 
-class WorkerSignals(QObject):
-    log = pyqtSignal(str)
-    progress = pyqtSignal(float)
-    status = pyqtSignal(str)
-    task_started = pyqtSignal(str)
-    task_finished = pyqtSignal(str)
+logger = logging.getLogger(__name__)
+ytdl_logger = logging.getLogger("master_studio.ytdlp")
+
+CANCELLED = "已取消"
 
 class YtdlLogger:
-    def __init__(self, signals):
-        self.signals = signals
+    def __init__(self, log):
+        self.log = log
 
     def debug(self, msg):
-        if not msg.startswith('[debug] '): 
-            print(f"[yt-dlp DEBUG] {msg}")
+        # yt-dlp 的普通输出与 [debug] 详细信息都走 debug()，级别未开启时不做任何格式化
+        ytdl_logger.debug(msg)
 
     def warning(self, msg):
-        self.signals.log.emit(f"⚠️ {msg}")
+        self.log(f"⚠️ {msg}")
 
     def error(self, msg):
         # 屏蔽 Cookie 相关的报错显示，避免刷屏，由上层逻辑处理
         if "cookie" in msg.lower() or "permission" in msg.lower():
-            print(f"[Suppress Error] {msg}")
+            ytdl_logger.warning("已屏蔽: %s", msg)
         else:
-            self.signals.log.emit(f"❌ {msg}")
+            self.log(f"❌ {msg}")
+
+def is_nested_list(info, entry):
+    """ 频道首页的条目是各个标签页 (视频 / Shorts / 直播)，与父级同一提取器，需继续按播放列表展开 """
+    ie_key = entry.get('ie_key')
+    return entry.get('_type') == 'playlist' or bool(ie_key and ie_key == info.get('extractor_key'))
+
+class GlobalWorker:
+    """ 两级下载流水线 + 独立编码池:
+    解析槽位 (extract_workers) 提前完成元数据/格式解析，下载槽位 (max_concurrent) 只负责传输字节，
+    慢速的页面解析不会让带宽闲置；字幕烧录/音频转码交给 PostProcessPool，下载与编码并行。解析只受 DownloadScheduler 的单站点请求频率限制，per_host_limit 只约束下载传输；
+    任务同时写入 TaskStore (SQLite)，内存队列只作调度用，崩溃或关闭后重启可自动续传。
+    本身不依赖 Qt: 任务事件发布到 self.events，图形界面经 qt_bridge.WorkerSignals 订阅，命令行/API 直接订阅 """
+    def __init__(self, max_workers=None, store=None, log_sink=None):
+        settings = load_settings()
+        self.log_sink = log_sink or LogSink(int(settings.get("log_max_lines", 2000)))
+        self.log = self.log_sink.write
+        self.pending = deque()  # 待解析的任务参数
+        self.resolved = deque() # 已解析、待下载的 job
+        self.events = EventBus()
+        self.scheduler = DownloadScheduler(settings)
+        self.store = store or TaskStore()
+        self.archive = DownloadArchive()
+        self.cookies = BrowserCookieProvider(settings.get("cookie_browser", "edge"), int(settings.get("cookie_ttl_min", 30)) * 60,
+                                             domains=settings.get("cookie_domains") or COOKIE_DOMAINS)
+        self.max_attempts = int(settings.get("max_attempts", 3))
+        self.ytdlp_verbose = bool(settings.get("ytdlp_verbose", False))
+        if max_workers is None:
+            max_workers = settings.get("max_concurrent", 3)
+        try: self.max_workers = max(1, int(max_workers))
+        except (TypeError, ValueError): self.max_workers = 3
+        try: self.extract_workers = max(1, int(settings.get("extract_workers", 2)))
+        except (TypeError, ValueError): self.extract_workers = 2
+        # 最多提前解析的任务数，避免解析出的直链在排队期间过期
+        self.resolve_ahead = self.max_workers * 2
+        self.post = PostProcessPool(partial(self._emit, 'status'), settings, log=self.log, progress=self._encode_progress)
+        self.ydl_pool = YdlPool(max_idle=(self.max_workers + self.extract_workers) * 2)
+        # 进度回调与日志器必须是长期存在的同一对象，YdlPool 才能按参数命中已有实例
+        self.ydl_logger = YtdlLogger(self.log)
+        self.progress = ProgressTracker(self._emit_progress, fps=int(settings.get("progress_fps", 8)))
+        self._hook = self._dispatch_progress
+        self._ctx = threading.local() # 当前线程正在处理的 task_id
+        self._threads = []
+        self._active = set()
+        self._cancelled = set() # 已请求取消、仍在解析/下载/编码中的任务
+        self._bytes_seen = {} # (task_id, 文件名) -> 已计入限速的字节数
+        self._cond = threading.Condition()
+
+    @property
+    def is_working(self):
+        with self._cond: return bool(self._active)
 
-class GlobalWorker(threading.Thread):
-    def __init__(self, signals):
-        super().__init__(daemon=True)
-        self.queue = queue.Queue()
-        self.signals = signals
-        self.is_working = False 
+    def start(self):
+        if self._threads: return
+        self.cookies.start()
+        resumed = self.store.recover(self.max_attempts)
+        if resumed:
+            self.log(f"♻️ 恢复上次未完成的任务: {len(resumed)} 个")
+            with self._cond:
+                for params in resumed:
+                    self._emit('task_queued', params['task_id'], params['url'])
+                    self.pending.append(params)
+        for i in range(self.extract_workers):
+            self._spawn(self._extract_loop, f"ExtractSlot-{i}")
+        for i in range(self.max_workers):
+            self._spawn(self._download_loop, f"DownloadSlot-{i}")
+
+    def _spawn(self, target, name):
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def shutdown(self):
+        """ 退出前释放缓存的 YoutubeDL 实例 (保存 Cookie、关闭连接) """
+        self.ydl_pool.close_all()
 
     def add_task(self, task_data):
-        self.queue.put(task_data)
+        """ 入队并返回 task_id """
+        return self.add_tasks([task_data])[0]
+
+    def add_tasks(self, items, dedupe=False):
+        """ 批量入队: 一次事务写库、一次唤醒工作线程，返回与输入顺序一致的 task_id 列表
+        dedupe: 跳过记录键 (key) 已在排队或运行中的项 (播放列表展开、订阅同步)，只返回实际入队的 task_id """
+        batch = [self._normalize(item) for item in items]
+        if not batch: return []
+        batch = self.store.add_many(batch, skip_active=dedupe)
+        # 先发信号再入队，保证界面收到 queued 一定早于 started
+        for params in batch: self._emit('task_queued', params['task_id'], params['url'], parent=params.get('parent'))
+        with self._cond:
+            self.pending.extend(batch)
+            self._cond.notify_all()
+        return [params['task_id'] for params in batch]
+
+    def cancel(self, task_id):
+        """ 取消任务: 排队中的直接移出队列；解析中的在解析结束后丢弃；下载中的在下一次进度回调时中止；
+        编码中的立即终止 ffmpeg。任务以失败 (已取消) 结束，返回 False 表示任务不存在或已结束 """
+        with self._cond:
+            params = self._dequeue(task_id)
+            if not params:
+                if task_id not in self._active: return False
+                self._cancelled.add(task_id)
+        if params:
+            self.log(f"⛔ 已取消: {params['url']}")
+            self._finish(params, False, CANCELLED)
+            return True
+        self._emit('status', task_id, "正在取消...")
+        self.post.cancel(task_id)
+        return True
+
+    def _dequeue(self, task_id):
+        """ 从待解析 / 待下载队列中移除任务并返回其参数 (调用方持有 self._cond) """
+        for i, params in enumerate(self.pending):
+            if params['task_id'] == task_id:
+                del self.pending[i]
+                return params
+        for i, job in enumerate(self.resolved):
+            if job['params']['task_id'] == task_id:
+                del self.resolved[i]
+                # 解析阶段已腾出的队列空位可能让解析槽位继续
+                self._cond.notify_all()
+                return job['params']
+        return None
+
+    def _is_cancelled(self, task_id):
+        with self._cond: return task_id in self._cancelled
+
+    @staticmethod
+    def _normalize(task_data):
+        params = {}
+        if isinstance(task_data, str):
+            params = {'url': task_data, 'quality_idx': 0}
+        elif isinstance(task_data, tuple):
+            params = {'url': task_data[0], 'quality_idx': task_data[1]}
+        elif isinstance(task_data, dict):
+            params = dict(task_data)
+        
+        params.setdefault('url', '未知')
+        params.setdefault('quality_idx', 0)
+        params.setdefault('save_cover', True)
+        params.setdefault('embed_sub', True)
+        params.setdefault('save_sub_file', False)
+        params.setdefault('sub_lang_idx', 0)
+        params.setdefault('playlist', False)
+        
+        params['task_id'] = uuid.uuid4().hex[:12]
+        params['host'] = host_key(params['url'])
+        # 直接提交的任务 (界面 / API) 也记下记录键，排队去重 (skip_active) 才能看到它们
+        if 'key' not in params: params['key'] = archive_key(params['url'])
+        return params
 
-    def run(self):
+    def _take(self, items, ready=lambda: True, acquire=True):
+        """ 取出第一个所属站点仍有空闲配额的项 (acquire 为假时不占配额，直接取队首)，全部受限 (或 ready() 为假) 时等待 """
+        with self._cond:
+            while True:
+                if ready():
+                    for i, item in enumerate(items):
+                        if not acquire or self.scheduler.try_acquire(item['host']):
+                            del items[i]
+                            # 队列长度变化可能让等待 ready() 的解析槽位继续
+                            self._cond.notify_all()
+                            return item
+                self._cond.wait()
+
+    def _extract_loop(self):
         while True:
-            task = self.queue.get()
-            self.is_working = True
-            
-            current_url = "未知任务"
-            if isinstance(task, str): current_url = task
-            elif isinstance(task, dict): current_url = task.get('url', '未知')
+            # 解析不占站点并发配额 (由 throttle_request 限频)，否则同一站点的解析与下载互相挤占 per_host_limit
+            params = self._take(self.pending, ready=lambda: len(self.resolved) < self.resolve_ahead, acquire=False)
+            task_id = params['task_id']
+            with self._cond: self._active.add(task_id)
+            self._emit('task_started', task_id, params['url'])
             
-            self.signals.task_started.emit(current_url)
+            ok, detail = False, None
+            try:
+                logger.debug("解析任务: %s", params)
+                self.store.mark_running(task_id)
+                self._emit('status', task_id, "解析中...")
+                ok, detail = self.resolve_robust(params)
+            except Exception as e:
+                logger.exception("解析阶段异常: %s", params['url'])
+                self.log(f"❌ 严重错误: {str(e)}")
+                detail = str(e)
             
+            if self._is_cancelled(task_id):
+                self.log(f"⛔ 已取消: {params['url']}")
+                self._finish(params, False, CANCELLED)
+            elif ok and detail:
+                self._emit('status', task_id, "等待下载槽位...")
+                with self._cond:
+                    self.resolved.append(detail)
+                    self._cond.notify_all()
+            else:
+                self._finish(params, ok, detail)
+
+    def _download_loop(self):
+        while True:
+            job = self._take(self.resolved)
+            params = job['params']
+            ok, detail, post_job = False, None, None
             try:
-                print(f"[Worker] 处理任务: {task}")
-                
-                params = {}
-                if isinstance(task, str):
-                    params = {'url': task, 'quality_idx': 0}
-                elif isinstance(task, tuple):
-                    params = {'url': task[0], 'quality_idx': task[1]}
-                elif isinstance(task, dict):
-                    params = task
-                
-                params.setdefault('quality_idx', 0)
-                params.setdefault('save_cover', True)
-                params.setdefault('embed_sub', True)
-                params.setdefault('save_sub_file', False)
-                params.setdefault('sub_lang_idx', 0)
-                
-                self.process_video_robust(params)
-                
+                detail, post_job = self._execute_download(job)
+                ok = True
             except Exception as e:
-                error_msg = f"❌ 严重错误: {str(e)}"
-                self.signals.log.emit(error_msg)
+                if self._is_cancelled(params['task_id']):
+                    self.log(f"⛔ 已取消: {params['url']}")
+                    detail = CANCELLED
+                else:
+                    logger.warning("下载失败: %s", params['url'], exc_info=True)
+                    self.log(f"❌ 下载出错: {e}")
+                    detail = str(e)
             finally:
-                self.is_working = False
-                self.signals.task_finished.emit(current_url)
-                self.queue.task_done()
-                self.signals.progress.emit(0)
-                self.signals.status.emit("系统空闲")
-
-    def progress_hook(self, d):
-        if d['status'] == 'downloading':
-            try:
-                p = d.get('_percent_str', '0%').replace('%', '')
-                self.signals.progress.emit(float(p))
-                self.signals.status.emit(f"下载中... {p}%")
-            except: pass
-        elif d['status'] == 'finished':
-            self.signals.progress.emit(100)
-            self.signals.status.emit("处理中...")
-
-    def process_video_robust(self, params):
-        """ 包含重试逻辑的视频处理入口 """
+                self.scheduler.release(job['host'])
+            if post_job:
+                # 编码在独立池中进行，本槽位立即去接下一个下载；编码结束后任务才算完成
+                self._emit('status', params['task_id'], "等待编码槽位...")
+                self._submit_post(params, detail, post_job)
+            else:
+                self._finish(params, ok, detail)
+
+    def _submit_post(self, params, output_path, post_job):
+        def run():
+            task_id = params['task_id']
+            # 排队等编码期间已被取消的任务不再启动 ffmpeg
+            if self._is_cancelled(task_id):
+                self.log(f"⛔ 已取消: {params['url']}")
+                return False, CANCELLED
+            self.progress.set_percent(task_id, 0.0)
+            try: return True, post_job() or output_path
+            except EncodeCancelled:
+                self.log(f"⛔ 已取消: {params['url']}")
+                return False, CANCELLED
+            except Exception as e:
+                logger.exception("后处理异常: %s", output_path)
+                self.log(f"❌ 后处理出错: {e}")
+                return True, output_path
+        future = self.post.submit(run)
+        future.add_done_callback(lambda f: self._finish(params, *f.result()))
+
+    def _finish(self, params, ok, detail):
+        task_id = params['task_id']
+        try:
+            if ok: self.store.mark_done(task_id, detail)
+            else: self.store.mark_failed(task_id, detail)
+        except Exception:
+            logger.exception("任务状态写入失败: %s", task_id)
+        self.progress.discard(task_id)
+        self.post.forget(task_id)
+        with self._cond:
+            self._active.discard(task_id)
+            self._cancelled.discard(task_id)
+            for key in [k for k in self._bytes_seen if k[0] == task_id]: del self._bytes_seen[key]
+            # 站点配额释放后，之前被跳过的同站点任务可能已可执行
+            self._cond.notify_all()
+        self._emit('task_finished', task_id, params['url'], ok=ok)
+
+    def _dispatch_progress(self, d):
+        self.progress_hook(self._ctx.task_id, d)
+
+    def progress_hook(self, task_id, d):
+        # 热路径上只读集合成员，不加锁；从回调里抛出 DownloadCancelled 是 yt-dlp 中止下载的标准方式
+        if task_id in self._cancelled:
+            from yt_dlp.utils import DownloadCancelled
+            raise DownloadCancelled(CANCELLED)
+        if d['status'] == 'downloading': self._throttle_bytes(task_id, d)
+        self.progress.update(task_id, d)
+
+    def _emit(self, name, task_id, value, **extra):
+        self.events.publish(name, {'task_id': task_id, EVENT_FIELDS[name]: value, **extra})
+
+    def _emit_progress(self, task_id, percent, text):
+        self._emit('progress', task_id, percent)
+        self._emit('status', task_id, text)
+
+    def _encode_progress(self, task_id, percent, text):
+        """ 编码进度同样记入 ProgressTracker，API 查询到的是编码进度而不是下载结束时的 100% """
+        self.progress.set_percent(task_id, percent)
+        self._emit_progress(task_id, percent, text)
+
+    def _throttle_bytes(self, task_id, d):
+        """ 把本次回调新增的字节计入全局带宽令牌桶 (在下载线程内阻塞即实现限速) """
+        done = d.get('downloaded_bytes') or 0
+        key = (task_id, d.get('filename'))
+        with self._cond:
+            last = self._bytes_seen.get(key, 0)
+            self._bytes_seen[key] = done
+        self.scheduler.throttle_bytes(done - last if done >= last else done)
+
+    def resolve_robust(self, params):
+        """ 阶段一: 包含 Cookie 降级逻辑的解析入口
+        返回 (True, job) / 已下载过时 (True, None) / 失败时 (False, 错误信息) """
         url = params['url']
         
-        # 1. 尝试使用 Cookies 下载 (高画质)
+        # 0. 解析前先查下载记录，已下载过的直接跳过，不产生任何网络请求
+        key = params['key'] if 'key' in params else archive_key(url)
+        if key and key in self.archive:
+            self.log(f"⏭️ 已在下载记录中，跳过: {url}")
+            return True, None
+        
+        self.log(f"🚀 开始任务: {url}")
+        cookie_file = self.cookies.current()
+        
+        # 1. 尝试使用 Cookies 快照解析 (高画质)
+        if cookie_file:
+            try:
+                self.log(f"🍪 使用 {self.cookies.browser.title()} Cookies 快照 (解锁高画质)...")
+                return True, self._extract(params, cookie_file=cookie_file) # 成功则直接返回
+            except Exception as e:
+                err_msg = str(e).lower()
+                # 仅 Cookie 相关错误才降级，其余错误直接失败
+                if not ("permission denied" in err_msg or "cookie" in err_msg or "lock" in err_msg):
+                    self.log(f"❌ 解析出错: {e}")
+                    return False, str(e)
+                self.log("⚠️ Cookies 快照失效，已通知后台重新读取")
+                self.cookies.request_refresh()
+        elif not self.cookies.browser:
+            self.log("👤 未启用浏览器 Cookies，使用游客模式解析")
+        else:
+            self.log(f"⚠️ 暂无可用的 {self.cookies.browser.title()} Cookies (浏览器可能正忙)")
+        
+        # 2. 降级 (无 Cookies)
+        if self.cookies.browser: self.log("🔄 使用【游客模式】解析...")
         try:
-            self.signals.log.emit(f"🚀 开始任务: {url}")
-            self.signals.log.emit("🍪 尝试读取 Edge Cookies (解锁高画质)...")
-            self._execute_download(params, use_cookies=True)
-            return # 成功则直接返回
-        except Exception as e:
-            err_msg = str(e).lower()
-            # 捕获权限错误或 Cookie 错误
-            if "permission denied" in err_msg or "cookie" in err_msg or "lock" in err_msg:
-                self.signals.log.emit("⚠️ Edge 浏览器正忙 (文件被锁定)")
-                self.signals.log.emit("🔄 自动切换至【游客模式】重试...")
-                
-                # 2. 降级重试 (无 Cookies)
-                try:
-                    self._execute_download(params, use_cookies=False)
-                except Exception as e2:
-                    self.signals.log.emit(f"❌ 游客模式下载失败: {e2}")
-            else:
-                self.signals.log.emit(f"❌ 下载出错: {e}")
+            return True, self._extract(params)
+        except Exception as e2:
+            self.log(f"❌ 游客模式解析失败: {e2}")
+            return False, str(e2)
 
-    def _execute_download(self, params, use_cookies=True):
-        """ 实际执行 yt-dlp 的内部函数 """
-        url = params['url']
+    def _build_opts(self, params, cookie_file=None):
         q_idx = params['quality_idx']
         
         mode_names = ['智能合成 (MP4)', '仅视频流', '仅音频流', '原始分流', '1080p 合成']
         mode_name = mode_names[q_idx] if q_idx < len(mode_names) else '未知'
         
-        if not use_cookies:
-            self.signals.log.emit(f"🔧 模式: {mode_name} (游客)")
+        if not cookie_file:
+            self.log(f"🔧 模式: {mode_name} (游客)")
         
         lang_map = {
             0: ['ja', 'zh-Hans', 'zh-CN', 'en', 'zh-Hant', 'zh-TW'], 
@@ -140,11 +384,12 @@ class GlobalWorker(threading.Thread):
         ydl_opts = {
             'outtmpl': os.path.join(DOWNLOAD_DIR, '%(uploader)s - %(title)s [%(id)s]', '%(uploader)s - %(title)s [%(id)s].%(ext)s'),
             'ffmpeg_location': BIN_DIR,
-            'download_archive': ARCHIVE_FILE,
-            'quiet': False, 'verbose': True,
+            'download_archive': self.archive,
+            # 进度由 progress_hooks 上报，关闭 yt-dlp 自带的进度行输出
+            'quiet': False, 'noprogress': True, 'verbose': self.ytdlp_verbose,
             'nocheckcertificate': True, 'noplaylist': True,
-            'progress_hooks': [self.progress_hook],
-            'logger': YtdlLogger(self.signals),
+            'progress_hooks': [self._hook],
+            'logger': self.ydl_logger,
             'writethumbnail': params['save_cover'], 
             'writesubtitles': params['embed_sub'] or params['save_sub_file'], 
             'subtitleslangs': sub_langs, 
@@ -154,96 +399,146 @@ class GlobalWorker(threading.Thread):
             },
             'retries': 10,
             'fragment_retries': 10,
+            'retry_sleep_functions': {'http': retry_backoff, 'fragment': retry_backoff, 'extractor': retry_backoff},
         }
 
-        # 动态添加 Cookie 配置
-        if use_cookies:
-            ydl_opts['cookiesfrombrowser'] = ('edge',)
+        # 列表中已解析的条目 (没有独立链接) 以父链接 + 序号入队，只处理这一项
+        if params.get('playlist_items'): ydl_opts['playlist_items'] = params['playlist_items']
+
+        # 动态添加 Cookie 配置 (读取快照文件，不直接访问浏览器数据库)
+        if cookie_file:
+            ydl_opts['cookiefile'] = cookie_file
 
         if q_idx == 0: 
             ydl_opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
             ydl_opts['merge_output_format'] = 'mp4' 
         elif q_idx == 1: ydl_opts['format'] = 'bestvideo'
         elif q_idx == 2:
+            # MP3 转码不再作为 yt-dlp 后处理器在下载线程里执行，而是交给编码池
             ydl_opts['format'] = 'bestaudio/best'
-            ydl_opts['postprocessors'] = [{'key': 'FFmpegExtractAudio','preferredcodec': 'mp3','preferredquality': '192'}]
             ydl_opts['writesubtitles'] = False
         elif q_idx == 3: ydl_opts['format'] = 'bestvideo,bestaudio'
         elif q_idx == 4:
             ydl_opts['format'] = 'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4]/best'
             ydl_opts['merge_output_format'] = 'mp4'
+        return ydl_opts
 
-        video_path = None
+    def _extract(self, params, cookie_file=None):
+        """ 只解析不下载，返回交给下载槽位的 job；命中下载记录或播放列表已展开时返回 None """
+        if params.get('playlist'): return self._fan_out(params, cookie_file)
+        ydl_opts = self._build_opts(params, cookie_file)
         
         # 抛出异常由上层捕获
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            if 'entries' in info: info = info['entries'][0]
-            
-            target_dir = os.path.join(DOWNLOAD_DIR, f"{info.get('uploader')} - {info.get('title')} [{info.get('id')}]")
-            
-            if q_idx in [2, 3]: return
+        self.scheduler.throttle_request(params['host'])
+        self._ctx.task_id = params['task_id']
+        with self.ydl_pool.lease(ydl_opts) as ydl:
+            # 先不处理 (process=False): 列表链接此时只请求列表页，不会逐个解析全部条目
+            info = ydl.extract_info(params['url'], download=False, process=False)
+            for _ in range(3):
+                # 短链等跳转结果继续跟随，同样先不处理，以免跳转目标是列表
+                if not info or info.get('_type') != 'url': break
+                info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+            if info and info.get('_type') in ('playlist', 'multi_video'):
+                if not params.get('playlist_items'):
+                    # 非播放列表模式下仍是列表 (纯列表链接、B 站多 P): 与原先一样下载全部条目，按展开流程逐条入队
+                    self._enqueue_entries(params, info)
+                    return None
+                # 展开时入队的已解析条目: 按 playlist_items 只处理其中一项
+                entries = (ydl.process_ie_result(info, download=False) or {}).get('entries') or []
+                if not entries: raise Exception(f"播放列表中找不到第 {params['playlist_items']} 项")
+                info = entries[0]
+            elif info: info = ydl.process_ie_result(info, download=False)
+        if not info: return None # 解析阶段命中下载记录
+        # 下载阶段按实际媒体所在站点限流 (短链解析后可能换了域名)
+        host = host_key(info.get('webpage_url') or params['url'])
+        return {'params': params, 'opts': ydl_opts, 'info': info, 'host': host}
+
+    # 播放列表展开时每攒够这么多条就批量入队一次，下载不必等整个频道翻页完毕
+    FAN_OUT_BATCH = 100
 
-            if os.path.exists(target_dir):
-                for f in os.listdir(target_dir):
-                    if f.endswith((".mp4", ".webm", ".mkv")) and "_Master" not in f and not f.endswith(".m4a"):
-                        video_path = os.path.join(target_dir, f)
-                        break
+    def _fan_out(self, params, cookie_file=None):
+        """ 播放列表/频道模式: 平铺解析 (extract_flat) 只取条目 ID 与链接，不解析各视频的格式；
+        process=False 时 entries 是按页请求的生成器，边翻页边去重、边分批入队交给下载池。
+        已在下载记录中的条目直接跳过，频道再次同步时只会下载新增的视频 """
+        self.scheduler.throttle_request(params['host'])
+        self._ctx.task_id = params['task_id']
+        with self.ydl_pool.lease(self.flat_opts(cookie_file)) as ydl:
+            info = ydl.extract_info(params['url'], download=False, process=False)
+            # 条目生成器按需翻页，须在租用期内遍历完
+            if info: self._enqueue_entries(params, info)
+        return None
 
-        if video_path and params['embed_sub'] and q_idx in [0, 4, 1]:
-            self.burn_subs(video_path, keep_sub_file=params['save_sub_file'])
+    def _enqueue_entries(self, params, info):
+        """ 把未处理 (process=False) 的列表条目去重后作为子任务分批入队 """
+        child = {k: v for k, v in params.items() if k not in ('task_id', 'host', 'url', 'key', 'playlist_items')}
+        child['parent'] = params['task_id']
+        batch, seen, queued_ids = [], set(), []
+        skipped = listed = dropped = 0
+        self.log(f"📃 展开播放列表: {info.get('title') or params['url']}")
+        entries = info.get('entries') if info.get('_type') in ('playlist', 'multi_video') else [info]
+        for index, entry in enumerate(entries or [], 1):
+            # 展开途中被取消: 剩余条目不再翻页入队，已入队的子任务一并取消
+            if self._is_cancelled(params['task_id']):
+                for child_id in queued_ids: self.cancel(child_id)
+                return
+            if not entry: continue
+            url = entry.get('url') or entry.get('webpage_url')
+            # 通用页面里的多个 <video> 等条目已直接解析出格式、没有独立链接: 以父链接 + 序号入队
+            resolved = not url and entry.get('_type', 'video') not in ('url', 'url_transparent')
+            if not url and not resolved:
+                dropped += 1
+                continue
+            key = entry_key(entry)
+            if key and (key in seen or key in self.archive):
+                skipped += 1
+                continue
+            if key: seen.add(key)
+            listed += 1
+            if resolved: batch.append(dict(child, url=params['url'], key=key, playlist=False, playlist_items=str(index)))
+            else: batch.append(dict(child, url=url, key=key, playlist=is_nested_list(info, entry)))
+            if len(batch) >= self.FAN_OUT_BATCH:
+                queued_ids += self.add_tasks(batch, dedupe=True)
+                batch = []
+        # 已在队列中的条目 (上次中断前展开的、重复提交的、订阅同步入队的) 由 dedupe 跳过
+        if batch: queued_ids += self.add_tasks(batch, dedupe=True)
+        self.log(f"✅ 播放列表已展开: 新增 {len(queued_ids)} 项，跳过已下载或重复 {skipped} 项，已在队列中 {listed - len(queued_ids)} 项")
+        # 有条目无法入队时父任务记为失败，不能看似完成却什么都没下载
+        if dropped: raise Exception(f"播放列表中有 {dropped} 项缺少链接，无法入队")
 
-    def burn_subs(self, input_path, keep_sub_file=False):
-        folder = os.path.dirname(input_path)
-        filename = os.path.basename(input_path)
-        basename_no_ext = os.path.splitext(filename)[0]
+    def flat_opts(self, cookie_file=None):
+        """ 平铺解析参数: 只列出条目，不解析各视频的格式 """
+        opts = {
+            'extract_flat': 'in_playlist', 'lazy_playlist': True, 'noplaylist': False,
+            'quiet': True, 'noprogress': True, 'verbose': self.ytdlp_verbose,
+            'logger': self.ydl_logger, 'nocheckcertificate': True,
+            'retry_sleep_functions': {'http': retry_backoff, 'extractor': retry_backoff},
+        }
+        if cookie_file: opts['cookiefile'] = cookie_file
+        return opts
+
+    def _execute_download(self, job):
+        """ 阶段二: 按已解析的格式传输，返回 (输出路径, 需提交编码池的后处理作业或 None) """
+        params, info = job['params'], job['info']
+        q_idx = params['quality_idx']
         
-        ass_file = None
-        potential_files = [f for f in os.listdir(folder) if f.startswith(basename_no_ext)]
-        for f in potential_files:
-            if f.endswith(".ass"): ass_file = f; break
-        if not ass_file:
-            for f in potential_files:
-                 if f.endswith(".srt") and ("zh" in f or "CN" in f or "en" in f): ass_file = f; break
+        self._ctx.task_id = params['task_id']
+        # 视频流+音频流分开下载时按两者总大小计算进度，任一大小未知则逐文件计算
+        sizes = [f.get('filesize') or f.get('filesize_approx') for f in (info.get('requested_formats') or [info])]
+        # 原始分流 (bestvideo,bestaudio) 是先后两次独立下载，不在 requested_formats 中
+        streams = 2 if q_idx == 3 and not info.get('requested_formats') else len(sizes)
+        self.progress.begin(params['task_id'], sum(sizes) if all(sizes) else None, streams)
+        with self.ydl_pool.lease(job['opts']) as ydl:
+            info = ydl.process_ie_result(info, download=True) or info
+        # 产物路径直接取自 yt-dlp 的处理结果，不再拼目录名后 listdir 猜文件
+        result = DownloadResult.from_info(params['task_id'], info)
+        output = result.folder if q_idx == 3 else result.primary
         
-        if not ass_file:
-             for f in os.listdir(folder): 
-                 if f.endswith(".ass"): ass_file = f; break
-        if not ass_file:
-             for f in os.listdir(folder): 
-                 if f.endswith(".srt"): ass_file = f; break
-
-        if ass_file:
-            self.signals.status.emit("GPU 渲染中...")
-            self.signals.log.emit(f"🔥 烧录字幕: {ass_file}")
-            output_name = filename.replace(".mp4", "_Master.mp4")
-            if not output_name.endswith(".mp4"): output_name = os.path.splitext(output_name)[0] + "_Master.mp4"
-
-            original_cwd = os.getcwd()
-            try:
-                os.chdir(folder)
-                cmd = [FFMPEG_EXE, "-y", "-hwaccel", "cuda", "-i", filename, "-vf", f"subtitles='{ass_file}'", "-c:v", "h264_nvenc", "-preset", "p7", "-cq", "19", "-c:a", "copy", output_name]
-                si = subprocess.STARTUPINFO()
-                si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                
-                success = False
-                try:
-                    subprocess.run(cmd, startupinfo=si, capture_output=True, check=True)
-                    self.signals.log.emit("✅ 完成: 已生成内嵌版 (GPU)")
-                    success = True
-                except subprocess.CalledProcessError:
-                    self.signals.log.emit("⚠️ GPU 失败，切换 CPU...")
-                    cmd_cpu = [FFMPEG_EXE, "-y", "-i", filename, "-vf", f"subtitles='{ass_file}'", "-c:v", "libx264", "-crf", "23", "-c:a", "copy", output_name]
-                    try:
-                        subprocess.run(cmd_cpu, startupinfo=si, check=True)
-                        self.signals.log.emit("✅ 完成: 已生成内嵌版 (CPU)")
-                        success = True
-                    except: pass
-                
-                if success and not keep_sub_file:
-                    try: os.remove(ass_file)
-                    except: pass
-            finally:
-                os.chdir(original_cwd)
-        else:
-            self.signals.log.emit("⏩ 未找到字幕，跳过烧录")
+        if q_idx == 2:
+            if result.primary and not result.primary.endswith(".mp3"):
+                return output, partial(self.post.extract_audio, result.primary, task_id=params['task_id'])
+            return output, None
+        if q_idx == 3: return output, None
+
+        if result.primary and params['embed_sub'] and q_idx in [0, 4, 1]:
+            return output, partial(self.post.burn_subs, result, keep_sub_file=params['save_sub_file'], task_id=params['task_id'])
+        return output, None
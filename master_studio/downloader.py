@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class ChecksumError(Exception):
+    pass
+
+class RangeNotSupported(IOError):
+    pass
+
+def fetch_sha256(manifest_url, session=None, timeout=15):
+    """ 读取 .sha256 清单 (sha256sum 格式或纯哈希)，返回小写十六进制摘要 """
+    import requests
+    r = (session or requests).get(manifest_url, timeout=timeout)
+    r.raise_for_status()
+    m = re.search(r"\b[0-9a-fA-F]{64}\b", r.text)
+    if not m: raise ChecksumError(f"清单格式无法识别: {manifest_url}")
+    return m.group(0).lower()
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""): h.update(chunk)
+    return h.hexdigest()
+
+class ChunkedDownloader:
+    """ 多连接分块下载，可断点续传:
+    - 服务器支持 Range 时按 chunk_size 切块，connections 个连接并行下载，各自写入 .part 文件的对应偏移
+    - 每完成一块就把进度写入旁路状态文件 (.part.json)，中断或失败后再次运行只补齐缺失的块；
+      远端文件变化 (大小 / ETag / Last-Modified 不符) 时从头开始
+    - 全部完成后校验 SHA-256，通过才改名为目标文件；失败时保留 .part 供下次续传 """
+    def __init__(self, url, dest, sha256=None, connections=4, chunk_size=8 * 1024 * 1024, progress=None, session=None, retries=3):
+        self.url = url
+        self.dest = dest
+        self.sha256 = sha256.lower() if sha256 else None
+        self.connections = max(1, connections)
+        self.chunk_size = chunk_size
+        self.progress = progress # progress(已下载字节, 总字节)
+        self.session = session
+        self.retries = retries
+        self.part_path = dest + ".part"
+        self.state_path = dest + ".part.json"
+        self._lock = threading.Lock()
+        self._done_bytes = 0
+
+    def run(self):
+        import requests
+        if self.session is None: self.session = requests.Session()
+        meta = self._probe()
+        state = self._load_state(meta)
+        if meta['ranges'] and meta['size']:
+            self._download_ranges(meta, state)
+        else:
+            self._download_single()
+        if self.sha256:
+            digest = file_sha256(self.part_path)
+            if digest != self.sha256:
+                # 内容已损坏，续传无意义，清掉重来
+                self._discard()
+                raise ChecksumError(f"SHA-256 不匹配: 期望 {self.sha256}，实际 {digest}")
+        os.replace(self.part_path, self.dest)
+        try: os.remove(self.state_path)
+        except OSError: pass
+        return self.dest
+
+    def _probe(self):
+        """ 用 0-0 的 Range 请求探测: 206 表示支持分块，Content-Range 给出总大小 """
+        r = self.session.get(self.url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=(10, 30))
+        try:
+            r.raise_for_status()
+            meta = {'url': r.url, 'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'),
+                    'ranges': r.status_code == 206, 'size': 0}
+            total = r.headers.get('Content-Range', '').rpartition('/')[2]
+            if meta['ranges'] and total.isdigit(): meta['size'] = int(total)
+            elif not meta['ranges']: meta['size'] = int(r.headers.get('Content-Length') or 0)
+            return meta
+        finally:
+            r.close()
+
+    def _load_state(self, meta):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f: state = json.load(f)
+        except Exception: state = None
+        same = state and os.path.exists(self.part_path) and all(
+            state.get(k) == meta[k] for k in ('size', 'etag', 'last_modified')) and state.get('chunk_size') == self.chunk_size
+        if not same:
+            state = {'size': meta['size'], 'etag': meta['etag'], 'last_modified': meta['last_modified'],
+                     'chunk_size': self.chunk_size, 'done': []}
+        elif state['done']:
+            logger.info("续传 %s: 已完成 %d 块", os.path.basename(self.dest), len(state['done']))
+        return state
+
+    def _save_state(self, state):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _discard(self):
+        for p in (self.part_path, self.state_path):
+            try: os.remove(p)
+            except OSError: pass
+
+    def _report(self, n, total):
+        with self._lock:
+            self._done_bytes += n
+            done = self._done_bytes
+        if self.progress: self.progress(done, total)
+
+    def _download_ranges(self, meta, state):
+        size, url = meta['size'], meta['url']
+        chunks = [(i, start, min(start + self.chunk_size, size) - 1) for i, start in enumerate(range(0, size, self.chunk_size))]
+        done = set(state['done'])
+        if not done or not os.path.exists(self.part_path):
+            with open(self.part_path, 'wb') as f: f.truncate(size)
+            done.clear()
+            state['done'] = []
+        self._save_state(state)
+        self._done_bytes = sum(end - start + 1 for i, start, end in chunks if i in done)
+        todo = [c for c in chunks if c[0] not in done]
+
+        def fetch(chunk):
+            i, start, end = chunk
+            for attempt in range(self.retries + 1):
+                written = 0
+                try:
+                    r = self.session.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True, timeout=(10, 60))
+                    with r:
+                        if r.status_code != 206: raise IOError(f"服务器未按 Range 返回 (HTTP {r.status_code})")
+                        with open(self.part_path, 'r+b') as f:
+                            f.seek(start)
+                            for data in r.iter_content(256 * 1024):
+                                f.write(data)
+                                written += len(data)
+                                self._report(len(data), size)
+                    if written != end - start + 1: raise IOError(f"块 {i} 长度不符: {written}/{end - start + 1}")
+                    with self._lock:
+                        state['done'].append(i)
+                        self._save_state(state)
+                    return
+                except Exception:
+                    # 本块已计入的进度回退，重试时重新累计
+                    self._report(-written, size)
+                    if attempt >= self.retries: raise
+                    time.sleep(min(2 ** attempt, 30))
+
+        with ThreadPoolExecutor(max_workers=min(self.connections, len(todo) or 1), thread_name_prefix="RangeFetch") as pool:
+            for future in [pool.submit(fetch, c) for c in todo]: future.result()
+
+    def _download_single(self):
+        """ 服务器不支持 Range: 退回单连接整文件下载 (无法续传) """
+        self._done_bytes = 0
+        with self.session.get(self.url, stream=True, timeout=(10, 60)) as r:
+            r.raise_for_status()
+            total = int(r.headers.get('Content-Length') or 0)
+            with open(self.part_path, 'wb') as f:
+                for data in r.iter_content(1024 * 1024):
+                    f.write(data)
+                    self._report(len(data), total)
+
+class HttpRangeFile:
+    """ 只读、可 seek 的远程文件: 每次 read 按需发 Range 请求，并预读 block_size 字节缓存
+    可直接交给 zipfile.ZipFile —— 它先读文件尾部的中央目录，再只读取所需成员的数据，无需下载整个压缩包 """
+    def __init__(self, url, session=None, block_size=4 * 1024 * 1024, retries=3):
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self.block_size = block_size
+        self.retries = retries
+        self.fetched = 0 # 实际下载的字节数
+        self._pos = 0
+        self._buf_start, self._buf = 0, b""
+        r = session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=(10, 30))
+        with r:
+            r.raise_for_status()
+            total = r.headers.get('Content-Range', '').rpartition('/')[2]
+            if r.status_code != 206 or not total.isdigit(): raise RangeNotSupported(f"服务器不支持 Range 请求: {url}")
+            self.url, self.size = r.url, int(total)
+
+    def seekable(self): return True
+    def readable(self): return True
+    def tell(self): return self._pos
+    def close(self): self._buf = b""
+
+    def seek(self, offset, whence=0):
+        if whence == 1: offset += self._pos
+        elif whence == 2: offset += self.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, n=-1):
+        if n is None or n < 0: n = self.size - self._pos
+        n = min(n, self.size - self._pos)
+        if n <= 0: return b""
+        if not (self._buf_start <= self._pos and self._pos + n <= self._buf_start + len(self._buf)):
+            self._fill(self._pos, max(n, self.block_size))
+        off = self._pos - self._buf_start
+        data = self._buf[off:off + n]
+        self._pos += len(data)
+        return data
+
+    def _fill(self, start, length):
+        end = min(start + length, self.size) - 1
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(self.url, headers={'Range': f'bytes={start}-{end}'}, stream=True, timeout=(10, 60)) as r:
+                    if r.status_code != 206: raise IOError(f"服务器未按 Range 返回 (HTTP {r.status_code})")
+                    data = b"".join(r.iter_content(256 * 1024))
+                if len(data) != end - start + 1: raise IOError(f"Range 长度不符: {len(data)}/{end - start + 1}")
+                self._buf_start, self._buf = start, data
+                self.fetched += len(data)
+                return
+            except Exception:
+                if attempt >= self.retries: raise
+                time.sleep(min(2 ** attempt, 30))
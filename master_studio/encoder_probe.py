@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import subprocess
+import threading
+from master_studio.config import DATA_DIR, FFMPEG_EXE
+from master_studio.ffmpeg_check import verify
+
+CAPS_FILE = os.path.join(DATA_DIR, "encoder_caps.json")
+
+# 按优先级排列的硬件 H.264 编码器，自动模式下取第一个实测可用的
+HW_ENCODERS = ["h264_nvenc", "h264_qsv", "h264_amf"]
+
+_lock = threading.Lock()
+_caps = None
+
+def _run(args, timeout=20):
+    flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    return subprocess.run([FFMPEG_EXE] + args, capture_output=True, text=True,
+                          errors="replace", timeout=timeout, creationflags=flags)
+
+def _probe(version):
+    """ 一次性探测: 列出编码器与硬件加速方式，并对硬件编码器做 1 帧试编码确认驱动真的可用 """
+    encoders = set()
+    for line in _run(["-hide_banner", "-encoders"]).stdout.splitlines():
+        m = re.match(r"\s*V\S*\s+(\S+)", line)
+        if m: encoders.add(m.group(1))
+    hwaccels = [l.strip() for l in _run(["-hide_banner", "-hwaccels"]).stdout.splitlines()[1:] if l.strip()]
+    usable = []
+    for enc in HW_ENCODERS:
+        if enc not in encoders: continue
+        try:
+            r = _run(["-hide_banner", "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1", "-frames:v", "1", "-c:v", enc, "-f", "null", "-"])
+            if r.returncode == 0: usable.append(enc)
+        except Exception: pass
+    if "libx264" in encoders: usable.append("libx264")
+    return {"version": version, "hwaccels": hwaccels, "usable": usable}
+
+def get_caps():
+    """ 读取编码能力缓存；以 ffmpeg 校验记录 (内容哈希 + 版本) 为键，二进制不变时不启动任何子进程 """
+    global _caps
+    with _lock:
+        if _caps is not None: return _caps
+        try: record = verify()
+        except Exception: return {} # ffmpeg 尚未安装或不可用，不缓存，下次再探测
+        fp = record["sha256"]
+        cached = {}
+        if os.path.exists(CAPS_FILE):
+            try:
+                with open(CAPS_FILE, 'r', encoding='utf-8') as f: cached = json.load(f)
+            except Exception: cached = {}
+        if cached.get("fingerprint") != fp:
+            version = record["version"]
+            if cached.get("version") != version:
+                cached = _probe(version)
+            cached["fingerprint"] = fp
+            try:
+                with open(CAPS_FILE, 'w', encoding='utf-8') as f: json.dump(cached, f, indent=4)
+            except Exception: pass
+        _caps = cached
+        return _caps
+
+def encoder_args(name, settings, threads=0):
+    """ 返回 (输入端参数, 编码参数)；画质/速度取舍由 settings 中的预设控制 """
+    cq = str(settings.get("hw_cq", 19))
+    if name == "h264_nvenc":
+        hw_in = ["-hwaccel", "cuda"] if "cuda" in get_caps().get("hwaccels", []) else []
+        return hw_in, ["-c:v", "h264_nvenc", "-preset", settings.get("nvenc_preset", "p7"), "-cq", cq]
+    if name == "h264_qsv":
+        return [], ["-c:v", "h264_qsv", "-global_quality", cq]
+    if name == "h264_amf":
+        return [], ["-c:v", "h264_amf", "-rc", "cqp", "-qp_i", cq, "-qp_p", cq]
+    args = ["-c:v", "libx264", "-preset", settings.get("x264_preset", "veryfast"), "-crf", str(settings.get("x264_crf", 23))]
+    threads = int(settings.get("encode_threads", 0) or 0) or threads
+    if threads > 0: args += ["-threads", str(threads)]
+    return [], args
+
+def select_encoder(settings):
+    """ video_encoder 为 auto 时按缓存的实测结果选择，否则使用用户指定的编码器 """
+    wanted = settings.get("video_encoder", "auto")
+    if wanted and wanted != "auto": return wanted
+    usable = get_caps().get("usable", [])
+    return usable[0] if usable else "libx264"
@@ -0,0 +1,54 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 事件名 -> 除 task_id 外的主字段名；与 WorkerSignals 的 (task_id, 值) 参数一一对应
+EVENT_FIELDS = {
+    'task_queued': 'url', 'task_started': 'url', 'task_finished': 'url',
+    'status': 'text', 'progress': 'percent',
+}
+
+class Subscription:
+    """ 单个订阅者的有界队列；消费过慢时丢弃新事件并计数，绝不阻塞发布方 (下载线程) """
+    def __init__(self, maxsize=1000):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def get(self, timeout=None):
+        """ 返回 (事件名, 数据)；超时返回 None """
+        try: return self.queue.get(timeout=timeout)
+        except queue.Empty: return None
+
+class EventBus:
+    """ 进程内事件总线，下载引擎对外的唯一通知出口 (不依赖 Qt)
+    listen(): 同步回调，在发布线程内执行，须立即返回 (如 Qt 信号桥)
+    subscribe(): 有界队列，供 HTTP 推送等慢速消费方在自己的线程里读取 """
+    def __init__(self):
+        self._subs = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def listen(self, callback):
+        """ callback(事件名, 数据) """
+        with self._lock: self._listeners.append(callback)
+
+    def subscribe(self, maxsize=1000):
+        sub = Subscription(maxsize)
+        with self._lock: self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock: self._subs.discard(sub)
+
+    def publish(self, event, data):
+        with self._lock: listeners, subs = list(self._listeners), list(self._subs)
+        data = dict(data, ts=time.time())
+        for callback in listeners:
+            try: callback(event, data)
+            except Exception: logger.exception("事件回调出错: %s", event)
+        for sub in subs:
+            try: sub.queue.put_nowait((event, data))
+            except queue.Full: sub.dropped += 1
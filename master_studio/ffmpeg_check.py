@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from master_studio.config import DATA_DIR, FFMPEG_EXE
+
+VERIFY_FILE = os.path.join(DATA_DIR, "ffmpeg_verified.json")
+
+_lock = threading.Lock()
+_record = None
+
+def _stat(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime": st.st_mtime}
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""): h.update(chunk)
+    return h.hexdigest()
+
+def _run_version(path):
+    flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    r = subprocess.run([path, "-version"], capture_output=True, text=True, errors="replace", timeout=20, creationflags=flags)
+    if r.returncode != 0 or not r.stdout: raise RuntimeError(f"ffmpeg -version 返回 {r.returncode}")
+    return r.stdout.splitlines()[0].strip()
+
+def _load(record_file):
+    try:
+        with open(record_file, 'r', encoding='utf-8') as f: return json.load(f)
+    except Exception: return {}
+
+def verify(path=FFMPEG_EXE, record_file=VERIFY_FILE):
+    """ 返回 ffmpeg 校验记录 {path, size, mtime, version, sha256}；不可用时抛出异常
+    路径/大小/修改时间与记录一致时只需一次 stat，不启动子进程；
+    仅修改时间变化 (如被复制) 而内容哈希相同时也不重跑，只有二进制真正变化才执行 ffmpeg -version """
+    global _record
+    with _lock:
+        current = _stat(path)
+        if _record and all(_record.get(k) == v for k, v in current.items()): return _record
+        record = _load(record_file)
+        if not all(record.get(k) == v for k, v in current.items()):
+            digest = _sha256(path)
+            if record.get("sha256") != digest or record.get("path") != current["path"] or not record.get("version"):
+                record = {"version": _run_version(path)}
+            record.update(current, sha256=digest)
+            try:
+                with open(record_file, 'w', encoding='utf-8') as f: json.dump(record, f, indent=4)
+            except OSError: pass
+        _record = record
+        return record
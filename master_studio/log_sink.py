@@ -0,0 +1,58 @@
+import atexit
+import logging
+import queue
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from master_studio.config import LOG_FILE
+
+_listener = None
+
+class _DeferredQueueHandler(QueueHandler):
+    """ 进程内队列无需序列化，跳过 QueueHandler 默认的预格式化，格式化开销全部留给后台线程 """
+    def prepare(self, record):
+        return record
+
+def setup_logging(level="INFO", ytdlp_verbose=False, log_file=LOG_FILE, max_bytes=5 * 1024 * 1024, backups=5, console=False):
+    """ 非阻塞日志管线: 各线程只把记录放入队列，由 QueueListener 后台线程统一格式化并写入滚动文件
+    console=True 时 (命令行模式) 同时输出到标准错误 """
+    global _listener
+    if _listener: return
+    root = logging.getLogger("master_studio")
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.propagate = False
+    # yt-dlp 的屏幕输出量很大，默认只记录警告以上
+    logging.getLogger("master_studio.ytdlp").setLevel(logging.DEBUG if ytdlp_verbose else logging.WARNING)
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(threadName)s %(name)s: %(message)s"))
+    handlers = [file_handler]
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%H:%M:%S"))
+        handlers.append(stream)
+    q = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(q))
+    _listener = QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+class LogSink:
+    """ 任务日志汇聚点: 线程安全的环形缓冲 (界面定时批量取走)，同时以 INFO 级别写入日志管线
+    内存占用与界面刷新成本只取决于 max_lines，不随运行时长增长 """
+    def __init__(self, max_lines=2000):
+        self.max_lines = max_lines
+        self._pending = deque(maxlen=max_lines) # 界面尚未取走的行，积压过多时丢弃最旧的
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("master_studio.tasklog")
+
+    def write(self, line):
+        with self._lock: self._pending.append(line)
+        self._logger.info(line)
+
+    def drain(self):
+        """ 取走自上次调用以来的全部新行 """
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
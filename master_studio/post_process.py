@@ -0,0 +1,287 @@
+import csv
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from master_studio.config import FFMPEG_EXE, FFPROBE_EXE, load_settings
+from master_studio.encoder_probe import select_encoder, encoder_args
+from master_studio.progress import format_eta
+
+logger = logging.getLogger(__name__)
+
+STDERR_TAIL = 40 # 失败时保留的 ffmpeg 输出行数
+
+class EncodeCancelled(Exception):
+    pass
+
+def _hidden_window_kwargs():
+    """ Windows 下隐藏 ffmpeg 控制台窗口，其他系统无需处理 """
+    if os.name != 'nt': return {}
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return {'startupinfo': si}
+
+def filter_path(path):
+    """ 把文件路径转义为滤镜参数值 (如 subtitles=filename=...)
+    路径要经过两层解析: 先是滤镜图 (\\ ' [ ] , ; 有特殊含义)，再是滤镜选项 (\\ ' : 有特殊含义)，
+    所以按相反顺序各转义一次。Windows 路径统一换成正斜杠，盘符里的冒号也会被转义 """
+    path = os.path.abspath(path).replace("\\", "/")
+    for ch in "\\':":
+        path = path.replace(ch, "\\" + ch)
+    for ch in "\\'[],;":
+        path = path.replace(ch, "\\" + ch)
+    return path
+
+def default_encode_workers():
+    # 单个 x264 编码本身就是多线程的，按每 4 核一路并发即可吃满 CPU
+    return max(1, min(4, (os.cpu_count() or 2) // 4))
+
+class PostProcessPool:
+    """ 独立的 ffmpeg 编码池 (字幕烧录、音频转码)
+    每个作业是一个 ffmpeg 子进程，池大小按 CPU 核数限定；下载槽位提交后立即返回，下载与编码互相重叠。
+    编码进度经 -progress 管道实时上报，子进程按 task_id 登记，可随时取消 """
+    def __init__(self, status, settings=None, log=logger.info, progress=None):
+        self.status = status # status(task_id, 文本)
+        self.progress = progress # progress(task_id, 百分比, 状态文本)
+        self.log = log
+        self.settings = settings or load_settings()
+        try: workers = int(self.settings.get("encode_workers", 0) or 0)
+        except (TypeError, ValueError): workers = 0
+        self.workers = workers if workers > 0 else default_encode_workers()
+        # 多路并发时平分核心，避免每个 x264 都按全部核心开线程互相争抢
+        self.threads_per_job = max(1, (os.cpu_count() or 2) // self.workers) if self.workers > 1 else 0
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="EncodeSlot")
+        self._procs = {} # task_id -> 运行中的 ffmpeg 进程
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def cancel(self, task_id):
+        """ 终止该任务正在运行的 ffmpeg，之后它再启动的进程也会立即失败；返回是否终止了进程 """
+        with self._lock:
+            self._cancelled.add(task_id)
+            procs = list(self._procs.get(task_id, ()))
+        for proc in procs:
+            try: proc.kill()
+            except OSError: pass
+        return bool(procs)
+
+    def forget(self, task_id):
+        """ 任务结束后清除取消标记 """
+        with self._lock: self._cancelled.discard(task_id)
+
+    def _run(self, cmd, task_id="", on_progress=None, cwd=None):
+        """ 运行 ffmpeg 并按 task_id 登记以便取消。传入 on_progress(已编码秒数, fps) 时附加 -progress pipe:1 逐行解析；
+        stderr 由后台线程持续读走，只保留最后 STDERR_TAIL 行用于报错，既不整段堆在内存里，也不会因管道写满卡住 ffmpeg """
+        if on_progress: cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+        with self._lock:
+            # 登记与取消检查在同一把锁内，取消请求不会落在两者之间被漏掉
+            if task_id in self._cancelled: raise EncodeCancelled(task_id)
+            proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE if on_progress else subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace", cwd=cwd,
+                                    **_hidden_window_kwargs())
+            self._procs.setdefault(task_id, set()).add(proc)
+        tail = deque(maxlen=STDERR_TAIL)
+        reader = threading.Thread(target=tail.extend, args=(proc.stderr,), name="ffmpeg-stderr", daemon=True)
+        reader.start()
+        try:
+            if on_progress: _read_progress(proc.stdout, on_progress)
+            proc.wait()
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            reader.join()
+            with self._lock:
+                procs = self._procs.get(task_id)
+                if procs is not None:
+                    procs.discard(proc)
+                    if not procs: del self._procs[task_id]
+                cancelled = task_id in self._cancelled
+        if cancelled: raise EncodeCancelled(task_id)
+        if proc.returncode: raise subprocess.CalledProcessError(proc.returncode, cmd, stderr="".join(tail))
+
+    def _reporter(self, task_id, duration, label):
+        """ 返回 on_progress 回调: 已编码时长 / 总时长换算百分比，按实际耗时估算剩余时间；时长未知时不上报 """
+        if not (self.progress and task_id and duration > 0): return None
+        start = time.monotonic()
+        last = [0.0]
+        def report(done, fps):
+            now = time.monotonic()
+            if now - last[0] < 0.5 and done < duration: return
+            last[0] = now
+            percent = min(100.0, done * 100.0 / duration)
+            parts = [f"{label} {percent:.1f}%"]
+            if fps: parts.append(f"{fps:.0f} fps")
+            elapsed = now - start
+            if 0 < done < duration and elapsed >= 1: parts.append(f"剩余 {format_eta(elapsed * (duration - done) / done)}")
+            self.progress(task_id, percent, " · ".join(parts))
+        return report
+
+    def extract_audio(self, input_path, task_id=""):
+        """ 转为 192k MP3，成功后删除原始音频流 """
+        output_path = os.path.splitext(input_path)[0] + ".mp3"
+        if output_path == input_path: return input_path
+        self.status(task_id, "转码 MP3...")
+        cmd = [FFMPEG_EXE, "-y", "-i", input_path, "-vn", "-c:a", "libmp3lame", "-b:a", "192k", output_path]
+        try:
+            self._run(cmd, task_id, self._reporter(task_id, self._probe_duration(input_path), "转码 MP3..."))
+        except EncodeCancelled:
+            _remove(output_path)
+            raise
+        except Exception as e:
+            self.log(f"❌ 音频转码失败: {e}")
+            return input_path
+        _remove(input_path)
+        self.log("✅ 完成: 已转为 MP3")
+        return output_path
+
+    def burn_subs(self, result, keep_sub_file=False, task_id=""):
+        """ result: DownloadResult；字幕文件直接取自下载结果，成功时返回内嵌版路径 """
+        input_path = result.primary
+        sub_path = result.subtitle_for_burn()
+
+        if not sub_path:
+            self.log("⏩ 未找到字幕，跳过烧录")
+            return None
+
+        encoder = select_encoder(self.settings)
+        self.status(task_id, "GPU 渲染中..." if encoder != "libx264" else "CPU 渲染中...")
+        self.log(f"🔥 烧录字幕: {os.path.basename(sub_path)} ({encoder})")
+        output_path = os.path.splitext(input_path)[0] + "_Master.mp4"
+
+        success = False
+        # 时长同时用于分段判断和进度换算
+        duration = self._probe_duration(input_path)
+        min_sec = float(self.settings.get("segment_burn_min_sec", 1800) or 0)
+        try:
+            if encoder == "libx264" and min_sec and duration >= min_sec and (os.cpu_count() or 1) >= 4:
+                self.log(f"✂️ 长视频 ({int(duration // 60)} 分钟)，按关键帧分段并行烧录")
+                success = self._burn_segmented(input_path, sub_path, output_path, duration, task_id)
+                if not success: self.log("⚠️ 分段烧录失败，改为整段烧录...")
+
+            # 编码器来自缓存的能力探测结果，正常情况下一次成功；硬件编码运行期失败时才回退 libx264
+            if not success:
+                for enc in ([encoder, "libx264"] if encoder != "libx264" else ["libx264"]):
+                    on_progress = self._reporter(task_id, duration, "GPU 渲染中..." if enc != "libx264" else "CPU 渲染中...")
+                    if self._burn_single(input_path, sub_path, output_path, enc, task_id, on_progress):
+                        self.log(f"✅ 完成: 已生成内嵌版 ({enc})")
+                        success = True
+                        break
+                    if enc != "libx264": self.log(f"⚠️ {enc} 失败，切换 CPU...")
+        except EncodeCancelled:
+            # 半成品不保留
+            _remove(output_path)
+            raise
+
+        if not success: return None
+        if not keep_sub_file:
+            for path in result.subtitles.values(): _remove(path)
+        return output_path
+
+    def _burn_single(self, input_path, sub_path, output_path, enc, task_id="", on_progress=None):
+        # 不使用 os.chdir (进程级状态，并发编码会互相干扰): 全部用转义后的绝对路径，cwd 只作用于子进程
+        hw_in, codec_args = encoder_args(enc, self.settings, self.threads_per_job)
+        cmd = [FFMPEG_EXE, "-y"] + hw_in + ["-i", input_path, "-vf", f"subtitles=filename={filter_path(sub_path)}"] + codec_args + ["-c:a", "copy", output_path]
+        try:
+            self._run(cmd, task_id, on_progress, cwd=os.path.dirname(output_path))
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.warning("ffmpeg 烧录失败 (%s, 退出码 %s):\n%s", enc, e.returncode, e.stderr)
+            return False
+
+    def _burn_segmented(self, input_path, sub_path, output_path, duration, task_id=""):
+        """ 长视频并行烧录:
+        1. 按关键帧无损切出视频段 (segment muxer 只会在关键帧处切)
+        2. 各段并行编码；字幕滤镜前把时间戳平移回原片时间，滤镜后再移回，字幕与画面对齐
+        3. concat 无损拼接各段，并直接复制原片音轨 """
+        cores = os.cpu_count() or 4
+        jobs = max(2, cores // 4)
+        threads = max(1, cores // jobs)
+        folder = os.path.dirname(output_path)
+        tmp = tempfile.mkdtemp(prefix=".seg_", dir=folder)
+        sub_arg = filter_path(sub_path)
+        report = self._reporter(task_id, duration, "CPU 分段渲染中...")
+        encoded_sec, lock = {}, threading.Lock() # 段名 -> (已编码秒数, fps)，汇总为整片进度
+        try:
+            # 段数取并行数的 2 倍，让先完成的槽位有活可接
+            seg_time = max(60, duration / (jobs * 2))
+            self._run([FFMPEG_EXE, "-y", "-i", input_path, "-map", "0:v:0", "-c", "copy", "-f", "segment",
+                       "-segment_time", f"{seg_time:.3f}", "-reset_timestamps", "1",
+                       "-segment_list", os.path.join(tmp, "segments.csv"), "-segment_list_type", "csv",
+                       os.path.join(tmp, "seg_%04d.mp4")], task_id, cwd=folder)
+            with open(os.path.join(tmp, "segments.csv"), 'r', encoding='utf-8') as f:
+                segments = [(row[0], float(row[1])) for row in csv.reader(f) if row]
+            if not segments: return False
+
+            def encode(seg):
+                name, start = seg
+                out = "enc_" + name
+                vf = f"setpts=PTS+{start:.6f}/TB,subtitles=filename={sub_arg},setpts=PTS-{start:.6f}/TB"
+                _, codec_args = encoder_args("libx264", self.settings, threads)
+                cmd = [FFMPEG_EXE, "-y", "-i", os.path.join(tmp, name), "-vf", vf] + codec_args + ["-an", os.path.join(tmp, out)]
+
+                def on_progress(sec, fps):
+                    with lock:
+                        encoded_sec[name] = (sec, fps)
+                        report(sum(s for s, _ in encoded_sec.values()), sum(f for _, f in encoded_sec.values()))
+                self._run(cmd, task_id, on_progress if report else None, cwd=folder)
+                # 已完成的段不再计入实时 fps
+                with lock: encoded_sec[name] = (encoded_sec.get(name, (0.0, 0))[0], 0)
+                return out
+
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                encoded = list(pool.map(encode, segments))
+
+            list_file = os.path.join(tmp, "concat.txt")
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for name in encoded: f.write(f"file '{name}'\n")
+            # 列表中的相对路径按列表文件所在目录解析
+            self._run([FFMPEG_EXE, "-y", "-f", "concat", "-safe", "0", "-i", list_file,
+                       "-i", input_path, "-map", "0:v", "-map", "1:a?", "-c", "copy", output_path], task_id, cwd=folder)
+            self.log(f"✅ 完成: 已生成内嵌版 (libx264 × {len(encoded)} 段)")
+            return True
+        except EncodeCancelled:
+            raise
+        except Exception:
+            logger.warning("分段烧录失败: %s", input_path, exc_info=True)
+            return False
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @staticmethod
+    def _probe_duration(path):
+        """ 用 ffprobe 读取容器时长 (秒)，失败返回 0 """
+        try:
+            out = subprocess.run([FFPROBE_EXE, "-v", "error", "-show_entries", "format=duration",
+                                  "-of", "default=noprint_wrappers=1:nokey=1", path],
+                                 capture_output=True, text=True, check=True, **_hidden_window_kwargs()).stdout
+            return float(out.strip())
+        except Exception:
+            return 0.0
+
+def _read_progress(stream, on_progress):
+    """ -progress 输出为 key=value 行，每个统计块以 progress=continue / progress=end 结束 """
+    block = {}
+    for line in stream:
+        key, _, value = line.strip().partition("=")
+        block[key] = value
+        if key != "progress": continue
+        # out_time_ms 名不副实，单位同样是微秒；开头几块可能为 N/A
+        try: sec = max(0.0, int(block.get("out_time_us") or block.get("out_time_ms")) / 1e6)
+        except (TypeError, ValueError): sec = None
+        try: fps = float(block.get("fps") or 0)
+        except ValueError: fps = 0.0
+        if sec is not None: on_progress(sec, fps)
+        block = {}
+
+def _remove(path):
+    try: os.remove(path)
+    except OSError: pass
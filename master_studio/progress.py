@@ -0,0 +1,100 @@
+import threading
+import time
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024: return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+def format_eta(sec):
+    sec = int(sec)
+    if sec >= 3600: return f"{sec // 3600}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+    return f"{sec // 60:02d}:{sec % 60:02d}"
+
+class ProgressTracker:
+    """ 聚合 yt-dlp 进度回调: 直接用 downloaded_bytes/total_bytes 计算进度、速度与剩余时间，
+    并把每个任务的界面更新合并到固定帧率，下载再快也不会刷爆 Qt 事件循环 """
+    def __init__(self, emit, fps=8):
+        self.emit = emit # emit(task_id, 百分比, 状态文本)
+        self.interval = 1.0 / max(1, fps)
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def begin(self, task_id, expected_total=None, streams=1):
+        """ expected_total: 所有待下载文件 (如视频流+音频流) 的预估总字节数，未知时按各流进度平均；
+        streams: 待下载的文件数，大小未知时每个流各占 1/streams，第一个流完成不会直接显示 100% """
+        with self._lock: self._tasks[task_id] = self._new_state(expected_total, streams)
+
+    def discard(self, task_id):
+        with self._lock: self._tasks.pop(task_id, None)
+
+    def percent(self, task_id):
+        """ 当前进度百分比，任务不在下载中时返回 None """
+        with self._lock:
+            st = self._tasks.get(task_id)
+            return st['percent'] if st else None
+
+    def set_percent(self, task_id, percent):
+        """ 下载以外的阶段 (如编码) 直接给出百分比，不做单调限制: 编码从 0% 重新开始 """
+        with self._lock:
+            st = self._tasks.get(task_id)
+            if st is None: st = self._tasks[task_id] = self._new_state()
+            st['percent'] = percent
+
+    def update(self, task_id, d):
+        status = d.get('status')
+        now = time.monotonic()
+        with self._lock:
+            st = self._tasks.get(task_id)
+            if st is None: st = self._tasks[task_id] = self._new_state()
+            name = d.get('filename')
+            if status == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                done = d.get('downloaded_bytes') or 0
+                if total:
+                    st['files'][name] = (done, total)
+                    st['fractions'][name] = done / total
+                elif d.get('fragment_count'):
+                    # 无字节总数的分片流 (部分 HLS) 退化为按分片计数
+                    st['fractions'][name] = (d.get('fragment_index') or 0) / d['fragment_count']
+                if d.get('speed'): st['speed'] = d['speed']
+                if now - st['last_emit'] < self.interval: return
+            elif status == 'finished':
+                done, total = st['files'].get(name, (0, 0))
+                st['files'][name] = (max(done, total), max(done, total))
+                st['fractions'][name] = 1.0
+            else:
+                return
+            percent = self._percent(st)
+            # 多文件下载时保持单调，避免第二个流开始时进度条回退
+            percent = max(st['percent'], min(percent, 100.0))
+            st['percent'] = percent
+            st['last_emit'] = now
+            text = self._describe(st, status, percent)
+        self.emit(task_id, percent, text)
+
+    @staticmethod
+    def _new_state(expected_total=None, streams=1):
+        return {'files': {}, 'fractions': {}, 'streams': max(1, streams or 1), 'expected': expected_total or 0,
+                'last_emit': 0.0, 'speed': 0.0, 'percent': 0.0}
+
+    @staticmethod
+    def _percent(st):
+        if st['expected']:
+            return sum(dn for dn, _ in st['files'].values()) * 100.0 / st['expected']
+        fractions = st['fractions']
+        if not fractions: return st['percent']
+        return sum(min(f, 1.0) for f in fractions.values()) * 100.0 / max(st['streams'], len(fractions))
+
+    @staticmethod
+    def _describe(st, status, percent):
+        if status == 'finished' and percent >= 100: return "处理中..."
+        parts = [f"下载中... {percent:.1f}%"]
+        speed = st['speed']
+        if speed:
+            parts.append(f"{format_size(speed)}/s")
+            total = st['expected'] or sum(t for _, t in st['files'].values())
+            remaining = total - sum(dn for dn, _ in st['files'].values())
+            if remaining > 0: parts.append(f"剩余 {format_eta(remaining / speed)}")
+        return " · ".join(parts)
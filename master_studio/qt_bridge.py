@@ -0,0 +1,20 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from master_studio.events import EVENT_FIELDS
+
+class WorkerSignals(QObject):
+    """ 把 GlobalWorker 事件总线转成 Qt 信号；事件在工作线程发布，Qt 自动排队到界面线程执行槽函数 """
+    # 所有任务相关信号的第一个参数均为 task_id，便于多任务并发时路由到对应进度条
+    # 日志不走信号，直接写入 LogSink，由界面定时批量取走
+    progress = pyqtSignal(str, float)
+    status = pyqtSignal(str, str)
+    task_queued = pyqtSignal(str, str)
+    task_started = pyqtSignal(str, str)
+    task_finished = pyqtSignal(str, str)
+
+    def __init__(self, events, parent=None):
+        super().__init__(parent)
+        events.listen(self._relay)
+
+    def _relay(self, event, data):
+        signal = getattr(self, event, None)
+        if signal is not None: signal.emit(data['task_id'], data[EVENT_FIELDS[event]])
@@ -0,0 +1,41 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# 烧录时字幕格式的优先级: ASS 保留原样式，其次 SRT，最后 WebVTT
+SUBTITLE_PRIORITY = (".ass", ".srt", ".vtt")
+
+@dataclass
+class DownloadResult:
+    """ 一次下载的实际产物，路径全部取自 yt-dlp 处理后的 info (requested_downloads / requested_subtitles)，
+    后续阶段直接使用，不再按文件名猜测或扫描目录 —— 并发任务写入同一目录时也不会拿错文件 """
+    task_id: str
+    video_id: Optional[str] = None
+    title: Optional[str] = None
+    files: List[str] = field(default_factory=list) # 最终媒体文件 (合并后的视频；分流模式下为各个流)
+    subtitles: Dict[str, str] = field(default_factory=dict) # 语言 -> 字幕文件，按请求的语言顺序
+    thumbnail: Optional[str] = None
+
+    @classmethod
+    def from_info(cls, task_id, info):
+        files = [d['filepath'] for d in info.get('requested_downloads') or [] if d.get('filepath')]
+        if not files and info.get('filepath'): files = [info['filepath']]
+        subtitles = {lang: sub['filepath'] for lang, sub in (info.get('requested_subtitles') or {}).items() if sub.get('filepath')}
+        thumbnail = next((t['filepath'] for t in reversed(info.get('thumbnails') or []) if t.get('filepath')), None)
+        return cls(task_id, info.get('id'), info.get('title'), files, subtitles, thumbnail)
+
+    @property
+    def primary(self):
+        """ 主输出文件，没有任何产物时为 None """
+        return self.files[0] if self.files else None
+
+    @property
+    def folder(self):
+        return os.path.dirname(self.primary) if self.primary else None
+
+    def subtitle_for_burn(self):
+        """ 按格式优先级、再按请求语言顺序选出要烧录的字幕 """
+        for ext in SUBTITLE_PRIORITY:
+            for path in self.subtitles.values():
+                if path.lower().endswith(ext) and os.path.exists(path): return path
+        return None
@@ -0,0 +1,79 @@
+import threading
+import time
+from urllib.parse import urlparse
+from master_studio.config import load_settings
+
+# 同一站点的短链/CDN 域名归并到主域名，共享并发与限速配额
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "googlevideo.com": "youtube.com",
+    "b23.tv": "bilibili.com",
+    "bilivideo.com": "bilibili.com",
+}
+
+def host_key(url):
+    """ 提取用于限流的站点标识 (二级域名) """
+    try: host = (urlparse(url).hostname or "").lower()
+    except ValueError: host = ""
+    parts = host.split(".")
+    base = ".".join(parts[-2:]) if len(parts) >= 2 else host
+    return HOST_ALIASES.get(base, base or "unknown")
+
+class TokenBucket:
+    """ 令牌桶: 每秒补充 rate 个令牌，rate <= 0 表示不限速 """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount=1):
+        if self.rate <= 0: return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            # 允许透支: 先扣减，再按欠额睡眠，大块数据也能平滑通过
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0: time.sleep(wait)
+
+class DownloadScheduler:
+    """ 按站点限制并发数与请求频率，并对总下载带宽做令牌桶限速 """
+    def __init__(self, settings=None):
+        settings = settings or load_settings()
+        self.per_host_limit = max(1, int(settings.get("per_host_limit", 2)))
+        self.host_rate = float(settings.get("host_requests_per_sec", 1.0))
+        self.byte_bucket = TokenBucket(float(settings.get("rate_limit_kbps", 0)) * 1024)
+        self._active = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, host):
+        """ 非阻塞占用站点槽位，已满则返回 False 让调用方先做别的任务 """
+        with self._lock:
+            if self._active.get(host, 0) >= self.per_host_limit: return False
+            self._active[host] = self._active.get(host, 0) + 1
+            return True
+
+    def release(self, host):
+        with self._lock:
+            n = self._active.get(host, 0) - 1
+            if n > 0: self._active[host] = n
+            else: self._active.pop(host, None)
+
+    def throttle_request(self, host):
+        """ 每次发起解析请求前调用，限制单站点请求频率 """
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.host_rate, capacity=self.per_host_limit)
+        bucket.consume(1)
+
+    def throttle_bytes(self, n):
+        if n > 0: self.byte_bucket.consume(n)
+
+def retry_backoff(n):
+    """ yt-dlp retry_sleep_functions: 指数退避，避免 429 后的重试风暴 """
+    return min(2 ** n, 60)
@@ -0,0 +1,34 @@
+""" 启动耗时记录: 主流程在关键节点调用 mark()，首帧绘制后 report() 写入日志与 logs/startup.jsonl
+需要逐模块的导入耗时，可用 `python -X importtime main.py 2> importtime.txt` 配合查看 """
+import json
+import logging
+import os
+import time
+from master_studio.config import LOGS_DIR
+
+HISTORY_FILE = os.path.join(LOGS_DIR, "startup.jsonl")
+
+logger = logging.getLogger(__name__)
+
+_t0 = time.perf_counter()
+_marks = []
+
+def mark(label):
+    """ 记录从上一个节点到现在的耗时 """
+    _marks.append((label, time.perf_counter()))
+
+def report(history_file=HISTORY_FILE):
+    """ 输出各阶段耗时并追加到历史文件，便于跨版本对比是否变慢；只在首次调用时生效 """
+    if not _marks: return None
+    phases, last = [], _t0
+    for label, t in _marks:
+        phases.append((label, round((t - last) * 1000)))
+        last = t
+    total = round((last - _t0) * 1000)
+    _marks.clear()
+    logger.info("启动耗时 %d ms: %s", total, " · ".join(f"{label} {ms} ms" for label, ms in phases))
+    try:
+        with open(history_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"ts": time.time(), "total_ms": total, "phases": dict(phases)}, ensure_ascii=False) + "\n")
+    except OSError: pass
+    return total
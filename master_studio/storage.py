@@ -0,0 +1,123 @@
+import json
+import sqlite3
+import threading
+import time
+from master_studio.config import DB_FILE
+
+def open_db(path=DB_FILE):
+    """ 打开共享数据库: WAL 模式允许读写并发，synchronous=NORMAL 减少 fsync """
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class TaskStore:
+    """ 持久化任务表: pending -> running -> done / failed """
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+    def __init__(self, path=DB_FILE):
+        self.conn = open_db(path)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    host TEXT,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    output_path TEXT,
+                    error TEXT,
+                    key TEXT
+                )""")
+            # 旧库补上记录键列
+            if 'key' not in {r['name'] for r in self.conn.execute("PRAGMA table_info(tasks)")}:
+                self.conn.execute("ALTER TABLE tasks ADD COLUMN key TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_key ON tasks(key, status)")
+
+    def add(self, params):
+        self.add_many([params])
+
+    def add_many(self, params_list, skip_active=False):
+        """ 批量写入并返回实际写入的任务；skip_active 时跳过记录键 (params['key']) 已有排队或运行中任务的项，
+        查重与写入在同一事务内，多个线程同时展开同一列表也不会重复入队 """
+        now = time.time()
+        with self.lock, self.conn:
+            if skip_active:
+                keys = list({p['key'] for p in params_list if p.get('key')})
+                active = set()
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    active.update(r['key'] for r in self.conn.execute(
+                        f"SELECT key FROM tasks WHERE key IN ({','.join('?' * len(chunk))}) AND status IN (?, ?)",
+                        chunk + [self.PENDING, self.RUNNING]))
+                params_list = [p for p in params_list if p.get('key') not in active]
+            rows = [(p['task_id'], p['url'], p.get('host'), json.dumps(p, ensure_ascii=False), now, p.get('key')) for p in params_list]
+            self.conn.executemany(
+                "INSERT INTO tasks (id, url, host, params, created_at, key) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return params_list
+
+    def mark_running(self, task_id):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (self.RUNNING, time.time(), task_id))
+
+    def mark_done(self, task_id, output_path=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, finished_at = ?, output_path = ?, error = NULL WHERE id = ?",
+                (self.DONE, time.time(), output_path, task_id))
+
+    def mark_failed(self, task_id, error=""):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                (self.FAILED, time.time(), str(error)[:2000], task_id))
+
+    def recover(self, max_attempts=3):
+        """ 启动时调用: 上次异常退出遗留的 running 任务重新排队，反复中断的判为失败 """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, error = ? WHERE status = ? AND attempts >= ?",
+                (self.FAILED, "多次中断后放弃", self.RUNNING, max_attempts))
+            self.conn.execute(
+                "UPDATE tasks SET status = ? WHERE status = ?", (self.PENDING, self.RUNNING))
+            rows = self.conn.execute(
+                "SELECT params FROM tasks WHERE status = ? ORDER BY created_at", (self.PENDING,)).fetchall()
+        return [json.loads(r['params']) for r in rows]
+
+    def get(self, task_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list_tasks(self, status=None, limit=100, offset=0):
+        """ 按创建时间倒序分页查询；status 走 idx_tasks_status 索引 """
+        sql, args = "SELECT * FROM tasks", []
+        if status:
+            sql += " WHERE status = ?"
+            args.append(status)
+        sql += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        args += [limit, offset]
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [self._row(r) for r in rows]
+
+    def counts(self):
+        """ 各状态的任务数 """
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        return {r['status']: r['n'] for r in rows}
+
+    @staticmethod
+    def _row(row):
+        task = dict(row)
+        task['params'] = json.loads(task['params'])
+        return task
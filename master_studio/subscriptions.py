@@ -0,0 +1,189 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from itertools import islice
+from master_studio.config import DB_FILE, load_settings
+from master_studio.storage import open_db
+from master_studio.archive import entry_key
+from master_studio.scheduler import host_key
+from master_studio.core_worker import is_nested_list
+
+logger = logging.getLogger(__name__)
+
+class SubscriptionStore:
+    """ 订阅源: 记录每个频道/播放列表最近见过的条目键 (最新在前) 与上次响应的 ETag / Last-Modified """
+    MAX_SEEN = 500
+
+    def __init__(self, path=DB_FILE):
+        self.conn = open_db(path)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT,
+                    params TEXT NOT NULL,
+                    interval_min INTEGER NOT NULL,
+                    enabled INTEGER NOT NULL DEFAULT 1,
+                    seen TEXT NOT NULL DEFAULT '[]',
+                    etag TEXT,
+                    last_modified TEXT,
+                    last_checked REAL NOT NULL DEFAULT 0,
+                    last_new REAL,
+                    created_at REAL NOT NULL
+                )""")
+
+    def add(self, url, params=None, interval_min=60):
+        """ 新增订阅并返回记录；同一 URL 已订阅时只更新参数与间隔 """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO subscriptions (id, url, params, interval_min, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET params = excluded.params, interval_min = excluded.interval_min, enabled = 1",
+                (uuid.uuid4().hex[:12], url, json.dumps(params or {}, ensure_ascii=False), max(1, int(interval_min)), time.time()))
+            row = self.conn.execute("SELECT * FROM subscriptions WHERE url = ?", (url,)).fetchone()
+        return self._row(row)
+
+    def remove(self, sub_id):
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM subscriptions WHERE id = ?", (sub_id,)).rowcount > 0
+
+    def get(self, sub_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM subscriptions WHERE id = ?", (sub_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM subscriptions ORDER BY created_at").fetchall()
+        return [self._row(r) for r in rows]
+
+    def due(self, now=None):
+        """ 已到轮询时间的订阅 """
+        now = now or time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM subscriptions WHERE enabled = 1 AND last_checked + interval_min * 60 <= ? ORDER BY last_checked",
+                (now,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def mark_due(self, sub_id=None):
+        """ 让订阅在下一轮立即检查 (sub_id 为空时全部) """
+        with self.lock, self.conn:
+            if sub_id: self.conn.execute("UPDATE subscriptions SET last_checked = 0 WHERE id = ?", (sub_id,))
+            else: self.conn.execute("UPDATE subscriptions SET last_checked = 0")
+
+    def record_poll(self, sub_id, seen, etag=None, last_modified=None, title=None, new_count=0):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE subscriptions SET seen = ?, etag = ?, last_modified = ?, title = COALESCE(?, title), "
+                "last_checked = ?, last_new = CASE WHEN ? > 0 THEN ? ELSE last_new END WHERE id = ?",
+                (json.dumps(seen[:self.MAX_SEEN]), etag, last_modified, title, now, new_count, now, sub_id))
+
+    @staticmethod
+    def _row(row):
+        sub = dict(row)
+        sub['params'] = json.loads(sub['params'])
+        sub['seen'] = json.loads(sub['seen'])
+        return sub
+
+class SubscriptionSync:
+    """ 订阅增量同步: 到期的订阅先发条件请求 (If-None-Match / If-Modified-Since)，未变化则直接跳过；
+    有变化时只平铺解析第一页条目，与已见记录和下载记录比对，仅把新增条目交给 GlobalWorker。
+    不重新解析整个频道，也不解析各视频的格式 """
+    def __init__(self, worker, store=None, settings=None):
+        settings = settings or load_settings()
+        self.worker = worker
+        self.store = store or SubscriptionStore()
+        self.page_size = max(1, int(settings.get("subscription_page_size", 30)))
+        self.default_interval = max(1, int(settings.get("subscription_interval_min", 60)))
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread: return
+        self._thread = threading.Thread(target=self._loop, name="SubscriptionSync", daemon=True)
+        self._thread.start()
+
+    def add(self, url, params=None, interval_min=None):
+        sub = self.store.add(url, params, interval_min or self.default_interval)
+        self._wake.set()
+        return sub
+
+    def sync_now(self, sub_id=None):
+        self.store.mark_due(sub_id)
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            for sub in self.store.due():
+                try: self.poll(sub)
+                except Exception as e:
+                    logger.warning("订阅检查失败: %s", sub['url'], exc_info=True)
+                    self.worker.log(f"⚠️ 订阅检查失败: {sub.get('title') or sub['url']} ({e})")
+                    # 失败也记一次检查时间，按正常间隔重试，避免对出错的源连续请求
+                    self.store.record_poll(sub['id'], sub['seen'], sub['etag'], sub['last_modified'])
+            self._wake.wait(60)
+            self._wake.clear()
+
+    def poll(self, sub):
+        """ 检查单个订阅，返回新入队的任务数 """
+        worker = self.worker
+        with worker.ydl_pool.lease(worker.flat_opts(worker.cookies.current())) as ydl:
+            changed, etag, last_modified = self._check_changed(ydl, sub)
+            if not changed:
+                logger.debug("订阅未变化 (304): %s", sub['url'])
+                self.store.record_poll(sub['id'], sub['seen'], etag, last_modified)
+                return 0
+            worker.scheduler.throttle_request(host_key(sub['url']))
+            info = ydl.extract_info(sub['url'], download=False, process=False) or {}
+            entries = iter(info.get('entries') or [])
+            first = next(entries, None)
+            if first and is_nested_list(info, first):
+                # 频道首页列出的是标签页，取第一个 (最新视频)
+                info = ydl.extract_info(first.get('url'), download=False, process=False) or {}
+                entries = iter(info.get('entries') or [])
+            elif first:
+                entries = _prepend(first, entries)
+            # lazy_playlist 下只会请求第一页
+            page = [(entry_key(e) or e.get('url'), e.get('url') or e.get('webpage_url')) for e in islice(entries, self.page_size) if e]
+
+        seen = set(sub['seen'])
+        new = [(key, url) for key, url in page if url and key not in seen and key not in worker.archive]
+        title = info.get('title')
+        queued = []
+        if new:
+            # 列表最新在前，按时间顺序入队
+            params = dict(sub['params'], playlist=False)
+            # 与正在展开的同一列表或上一轮仍在排队的条目去重
+            queued = worker.add_tasks([dict(params, url=url, key=key) for key, url in reversed(new)], dedupe=True)
+            worker.log(f"🔔 订阅更新: {title or sub['url']} 新增 {len(queued)} 项")
+        page_keys = [key for key, _ in page if key]
+        recent = set(page_keys)
+        self.store.record_poll(sub['id'], page_keys + [k for k in sub['seen'] if k not in recent],
+                               etag, last_modified, title, len(queued))
+        return len(queued)
+
+    @staticmethod
+    def _check_changed(ydl, sub):
+        """ HEAD 条件请求；返回 (是否可能有更新, ETag, Last-Modified)。站点不支持时视为有更新 """
+        from yt_dlp.networking import Request
+        from yt_dlp.networking.exceptions import HTTPError
+        headers = {}
+        if sub.get('etag'): headers['If-None-Match'] = sub['etag']
+        if sub.get('last_modified'): headers['If-Modified-Since'] = sub['last_modified']
+        try:
+            with ydl.urlopen(Request(sub['url'], headers=headers, method='HEAD')) as r:
+                return r.status != 304, r.headers.get('ETag'), r.headers.get('Last-Modified')
+        except HTTPError as e:
+            if e.status == 304: return False, sub.get('etag'), sub.get('last_modified')
+        except Exception:
+            pass
+        return True, None, None
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
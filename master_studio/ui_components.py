@@ -1,8 +1,9 @@
 from PyQt6.QtWidgets import (QFrame, QPushButton, QLineEdit, QStyledItemDelegate, 
-                             QStyle, QScrollArea, QGraphicsDropShadowEffect)
+                             QStyle, QScrollArea, QGraphicsDropShadowEffect,
+                             QWidget, QVBoxLayout, QLabel, QProgressBar, QPlainTextEdit)
 from PyQt6.QtGui import (QFont, QColor, QPainter, QPainterPath, QCursor, QPen, QLinearGradient)
 from PyQt6.QtCore import (Qt, QRectF, QRect, QSize, QPropertyAnimation, 
-                          QEasingCurve, QPoint, pyqtProperty)
+                          QEasingCurve, QPoint, QTimer, pyqtProperty)
 from master_studio.config import STYLE, APP_FONT_MAIN
 from master_studio.utils import get_recolored_icon
 
@@ -258,3 +259,65 @@ class SmoothScrollArea(QScrollArea):
             self.m_scrollAnim.start()
         else:
             event.ignore()
+
+# --- 6. 任务行 (队列中每个任务独立的进度条) ---
+class TaskProgressRow(QWidget):
+    def __init__(self, url, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet("background: transparent;")
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.setSpacing(4)
+        
+        self.lbl_title = QLabel(f"⏳ {url[:25]}...")
+        self.lbl_title.setStyleSheet(f"color: {STYLE['text_main']}; font-size: 12px;")
+        self.lbl_status = QLabel("排队中")
+        self.lbl_status.setStyleSheet(f"color: {STYLE['text_sub']}; font-size: 11px;")
+        
+        self.pbar = QProgressBar()
+        self.pbar.setFixedHeight(4)
+        self.pbar.setTextVisible(False)
+        self.pbar.setStyleSheet(f"""
+            QProgressBar {{ border: none; background: #E5E7EB; border-radius: 2px; }} 
+            QProgressBar::chunk {{ background: {STYLE['accent']}; border-radius: 2px; }}
+        """)
+        
+        layout.addWidget(self.lbl_title)
+        layout.addWidget(self.lbl_status)
+        layout.addWidget(self.pbar)
+        self.url = url
+        self.value = 0.0
+
+    def set_running(self):
+        self.lbl_title.setText(f"⬇️ {self.url[:25]}...")
+        self.lbl_status.setText("准备中...")
+
+    def set_progress(self, val):
+        self.value = val
+        self.pbar.setValue(int(val))
+
+    def set_status(self, text):
+        self.lbl_status.setText(text)
+
+# --- 7. 日志视图 (定时批量取日志的纯文本视图) ---
+class LogView(QPlainTextEdit):
+    def __init__(self, sink, interval=200, parent=None):
+        super().__init__(parent)
+        self.sink = sink
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        # QPlainTextEdit 只布局可见行，配合行数上限，长时间运行也不会越来越卡
+        self.setMaximumBlockCount(sink.max_lines)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval)
+
+    def flush(self):
+        # 页面不可见时不取日志，积压部分由 LogSink 的环形缓冲兜底
+        if not self.isVisible(): return
+        lines = self.sink.drain()
+        if not lines: return
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 4
+        self.appendPlainText("\n".join(lines))
+        if at_bottom: bar.setValue(bar.maximum())
@@ -1,20 +1,20 @@
 import os
 import sys
-import shutil
 import subprocess
+import logging
 import zipfile
-import requests
 from functools import lru_cache
-from PyQt6.QtGui import QFontDatabase, QPixmap, QPainter, QColor
-from PyQt6.QtSvg import QSvgRenderer
-from PyQt6.QtCore import Qt
-from master_studio.config import FONTS_DIR, ICON_DIR, BIN_DIR, FFMPEG_EXE
+# PyQt 与 requests 在函数内按需导入: DependencyManager 也供无界面的命令行模式使用
+from master_studio.config import FONTS_DIR, APP_FONT_FILES, ICON_DIR, BIN_DIR, FFMPEG_EXE, load_settings
 
-def load_custom_fonts():
-    if os.path.exists(FONTS_DIR):
-        for f in os.listdir(FONTS_DIR):
-            if f.lower().endswith((".ttf", ".otf")):
-                QFontDatabase.addApplicationFont(os.path.join(FONTS_DIR, f))
+logger = logging.getLogger(__name__)
+
+def load_custom_fonts(files=APP_FONT_FILES):
+    """ 只注册字体栈中实际用到的字体，避免启动时解析用不到的大字体文件 """
+    from PyQt6.QtGui import QFontDatabase
+    for f in files:
+        path = os.path.join(FONTS_DIR, f)
+        if os.path.exists(path): QFontDatabase.addApplicationFont(path)
 
 # 全局图标缓存
 _ICON_CACHE = {}
@@ -27,6 +27,9 @@ def get_recolored_icon(filename, color_hex, size=24):
     cache_key = f"{filename}_{color_hex}_{size}"
     if cache_key in _ICON_CACHE:
         return _ICON_CACHE[cache_key]
+    from PyQt6.QtGui import QPixmap, QPainter, QColor
+    from PyQt6.QtSvg import QSvgRenderer
+    from PyQt6.QtCore import Qt
 
     path = os.path.join(ICON_DIR, filename)
     
@@ -55,6 +58,7 @@ def get_recolored_icon(filename, color_hex, size=24):
 
 class DependencyManager:
     FFMPEG_URL = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
+    FFMPEG_SHA256_URL = FFMPEG_URL + ".sha256"
 
     @staticmethod
     def check_ffmpeg():
@@ -62,58 +66,80 @@ class DependencyManager:
         if not os.path.exists(FFMPEG_EXE) or not os.path.exists(ffprobe_exe):
             return False, "组件缺失"
         try:
-            # 兼容不同系统
-            flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-            subprocess.run([FFMPEG_EXE, "-version"], capture_output=True, creationflags=flags)
+            # 校验结果按 路径/大小/修改时间/哈希 缓存，二进制未变时启动不再运行 ffmpeg
+            from master_studio.ffmpeg_check import verify
+            verify(FFMPEG_EXE)
             return True, "已就绪"
         except Exception as e:
             return False, f"损坏: {str(e)}"
 
     @staticmethod
     def install_ffmpeg(progress_callback=None):
+        from master_studio.downloader import ChunkedDownloader, HttpRangeFile, ChecksumError, fetch_sha256
+        zip_path = os.path.join(BIN_DIR, "ffmpeg_temp.zip")
         try:
             if not os.path.exists(BIN_DIR): os.makedirs(BIN_DIR)
             if progress_callback: progress_callback("正在连接服务器...", 0)
-            
-            response = requests.get(DependencyManager.FFMPEG_URL, stream=True)
-            total_size = int(response.headers.get('content-length', 0))
-            block_size = 1024 * 1024
-            downloaded = 0
-            zip_path = os.path.join(BIN_DIR, "ffmpeg_temp.zip")
-            
-            with open(zip_path, 'wb') as f:
-                for data in response.iter_content(block_size):
-                    f.write(data)
-                    downloaded += len(data)
-                    if total_size > 0 and progress_callback:
-                        percent = int((downloaded / total_size) * 80)
-                        progress_callback(f"正在下载核心组件... {percent}%", percent)
-
-            if progress_callback: progress_callback("正在解压...", 85)
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                target_files = {}
-                for name in zip_ref.namelist():
-                    if name.endswith("bin/ffmpeg.exe"): target_files["ffmpeg.exe"] = name
-                    elif name.endswith("bin/ffprobe.exe"): target_files["ffprobe.exe"] = name
-                
-                if not target_files: raise Exception("下载包结构异常")
-
-                for target_name, source_path in target_files.items():
-                    with zip_ref.open(source_path) as source, open(os.path.join(BIN_DIR, target_name), "wb") as target:
-                        shutil.copyfileobj(source, target)
-
-            if progress_callback: progress_callback("正在清理...", 95)
-            os.remove(zip_path)
-            
+
+            def on_progress(done, total):
+                if total > 0 and progress_callback:
+                    percent = int(done * 90 / total)
+                    progress_callback(f"正在下载核心组件... {percent}%", percent)
+
+            # 默认完整下载 (可续传) 并按 SHA-256 清单校验整个压缩包。
+            # 流式解压需在设置中显式开启: 只用 Range 请求取出 ffmpeg.exe / ffprobe.exe，省流量，
+            # 但成员数据只有 zip 的 CRC32 校验，无法防篡改；流式失败时仍回到完整下载
+            installed = False
+            if load_settings().get("ffmpeg_stream_install", False):
+                try:
+                    remote = HttpRangeFile(DependencyManager.FFMPEG_URL)
+                    with zipfile.ZipFile(remote) as zip_ref:
+                        DependencyManager._extract_binaries(zip_ref, on_progress)
+                    installed = True
+                except Exception as e:
+                    logger.warning("流式解压失败，改为完整下载: %s", e)
+
+            if not installed:
+                # 拿不到清单就不安装: 否则只要拦下这一个请求就能绕过校验
+                try: sha256 = fetch_sha256(DependencyManager.FFMPEG_SHA256_URL)
+                except Exception as e:
+                    raise ChecksumError(f"无法获取 SHA-256 校验清单，为安全起见已停止安装 ({e})")
+                ChunkedDownloader(DependencyManager.FFMPEG_URL, zip_path, sha256=sha256,
+                                  progress=lambda done, total: on_progress(done * 8 // 9, total)).run()
+                if progress_callback: progress_callback("正在解压...", 85)
+                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                    DependencyManager._extract_binaries(zip_ref)
+                os.remove(zip_path)
+
             if progress_callback: progress_callback("安装完成！", 100)
             return True, "安装成功"
 
         except Exception as e:
-            if os.path.exists(os.path.join(BIN_DIR, "ffmpeg_temp.zip")):
-                os.remove(os.path.join(BIN_DIR, "ffmpeg_temp.zip"))
+            # 只删除已完成但无法使用的压缩包；未下完的 .part 与进度文件保留，下次续传
+            if os.path.exists(zip_path): os.remove(zip_path)
             return False, f"安装失败: {str(e)}"
 
+    @staticmethod
+    def _extract_binaries(zip_ref, progress=None):
+        """ 从压缩包中取出 bin/ffmpeg.exe 与 bin/ffprobe.exe；先写临时文件再替换，中断时不会留下半个可执行文件 """
+        targets = {}
+        for info in zip_ref.infolist():
+            if info.filename.endswith("bin/ffmpeg.exe"): targets["ffmpeg.exe"] = info
+            elif info.filename.endswith("bin/ffprobe.exe"): targets["ffprobe.exe"] = info
+        if not targets: raise Exception("下载包结构异常")
+
+        total = sum(info.file_size for info in targets.values())
+        done = 0
+        for target_name, info in targets.items():
+            final_path = os.path.join(BIN_DIR, target_name)
+            tmp_path = final_path + ".tmp"
+            with zip_ref.open(info) as source, open(tmp_path, "wb") as target:
+                for data in iter(lambda: source.read(1024 * 1024), b""):
+                    target.write(data)
+                    done += len(data)
+                    if progress: progress(done, total)
+            os.replace(tmp_path, final_path)
+
     @staticmethod
     def update_ytdlp():
         try:
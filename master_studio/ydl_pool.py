@@ -0,0 +1,68 @@
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+class YdlPool:
+    """ 按参数分组复用 YoutubeDL 实例
+    实例内的提取器缓存、Cookie Jar 与 HTTP 会话 (keep-alive 连接池) 都随实例保留，
+    同站点的连续任务可跳过初始化开销。YoutubeDL 非线程安全，同一实例同时只借给一个线程 """
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        self._idle = OrderedDict() # key -> [YoutubeDL, ...]，按最近使用排序
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(opts):
+        # 回调/对象类参数按身份区分，调用方需传入长期存在的同一对象才能命中
+        return json.dumps(opts, sort_keys=True, ensure_ascii=False, default=lambda o: f"{type(o).__name__}@{id(o)}")
+
+    @contextmanager
+    def lease(self, opts):
+        key = self.make_key(opts)
+        ydl = self._take(key)
+        if ydl is None:
+            import yt_dlp # 延迟导入: 启动时不加载，首个任务 (或首帧后的预热线程) 才加载
+            ydl = yt_dlp.YoutubeDL(opts)
+        try:
+            yield ydl
+        except BaseException:
+            # 出错的实例状态不可信 (如 Cookie 读取失败)，直接丢弃
+            self._close(ydl)
+            raise
+        self._give(key, ydl)
+
+    def _take(self, key):
+        with self._lock:
+            bucket = self._idle.get(key)
+            if not bucket: return None
+            self._count -= 1
+            ydl = bucket.pop()
+            if not bucket: del self._idle[key]
+            return ydl
+
+    def _give(self, key, ydl):
+        evicted = []
+        with self._lock:
+            self._idle.setdefault(key, []).append(ydl)
+            self._idle.move_to_end(key)
+            self._count += 1
+            while self._count > self.max_idle:
+                old_key, bucket = next(iter(self._idle.items()))
+                evicted.append(bucket.pop(0))
+                self._count -= 1
+                if not bucket: del self._idle[old_key]
+        for old in evicted: self._close(old)
+
+    def close_all(self):
+        with self._lock:
+            instances = [ydl for bucket in self._idle.values() for ydl in bucket]
+            self._idle.clear()
+            self._count = 0
+        for ydl in instances: self._close(ydl)
+
+    @staticmethod
+    def _close(ydl):
+        try: ydl.close()
+        except Exception: pass
@@ -0,0 +1,161 @@
+""" 本地 API 测试: 用桩替换解析/下载阶段，不访问网络，覆盖入队、查询、SSE 推送与取消 """
+import json
+import threading
+import time
+from functools import partial
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("yt_dlp")
+
+from master_studio import api_server, core_worker
+from master_studio.archive import DownloadArchive
+from master_studio.cookie_provider import BrowserCookieProvider
+from master_studio.log_sink import LogSink
+from master_studio.storage import TaskStore
+
+TOKEN = "test-token"
+AUTH = {'Authorization': f"Bearer {TOKEN}"}
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    db = str(tmp_path / "tasks.db")
+    monkeypatch.setattr(core_worker, "DownloadArchive", lambda: DownloadArchive(db, None))
+    monkeypatch.setattr(core_worker, "BrowserCookieProvider", lambda *a, **kw: BrowserCookieProvider("", 60, str(tmp_path / "cookies")))
+    monkeypatch.setattr(core_worker.DownloadScheduler, "throttle_request", lambda self, host: None)
+    w = core_worker.GlobalWorker(max_workers=2, store=TaskStore(db), log_sink=LogSink())
+    gate = threading.Event()
+
+    def extract(params, cookie_file=None):
+        """ 桩提取器: URL 含 fail 时解析失败，其余直接返回已解析的 job """
+        if "fail" in params['url']: raise Exception("解析失败")
+        return {'params': params, 'opts': {}, 'info': {'webpage_url': params['url']}, 'host': params['host']}
+
+    def download(job):
+        task_id = job['params']['task_id']
+        w.progress.begin(task_id, 100)
+        # 含 slow 的任务一直停在下载中，直到 gate 打开或被取消 (进度回调抛出 DownloadCancelled)
+        while "slow" in job['params']['url'] and not gate.wait(0.01):
+            w.progress_hook(task_id, {'status': 'downloading', 'filename': 'f', 'downloaded_bytes': 10, 'total_bytes': 100})
+        w.progress_hook(task_id, {'status': 'finished', 'filename': 'f', 'downloaded_bytes': 100, 'total_bytes': 100})
+        return str(tmp_path / f"{task_id}.mp4"), (partial(encode, task_id) if "encode" in job['params']['url'] else None)
+
+    def encode(task_id):
+        """ 桩编码作业: 报告 40% 后停住，直到 gate 打开 """
+        w._encode_progress(task_id, 40.0, "编码中... 40%")
+        gate.wait(5)
+
+    w._extract = extract
+    w._execute_download = download
+    w.start()
+    yield w
+    gate.set()
+    w.shutdown()
+
+@pytest.fixture
+def client(worker):
+    return api_server.create_app(worker, token=TOKEN).test_client()
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = predicate()
+        if result: return result
+        time.sleep(0.02)
+    raise AssertionError("等待超时")
+
+def task_status(client, task_id, *statuses):
+    task = client.get(f"/tasks/{task_id}", headers=AUTH).get_json()
+    return task if task['status'] in statuses else None
+
+def test_token_required(client):
+    assert client.get("/tasks").status_code == 401
+    assert client.get("/tasks", headers={'Authorization': "Bearer wrong"}).status_code == 401
+    assert client.get("/tasks", headers=AUTH).status_code == 200
+    assert client.get(f"/tasks?token={TOKEN}").status_code == 200
+
+def test_cors_only_on_trigger(client):
+    origin = {'Origin': "https://example.org"}
+    assert client.get("/trigger?url=https://example.com/v/1", headers=origin).headers.get('Access-Control-Allow-Origin')
+    assert client.get("/tasks", headers={**origin, **AUTH}).headers.get('Access-Control-Allow-Origin') is None
+
+def test_post_and_get_tasks(client):
+    r = client.post("/tasks", headers=AUTH, json={'tasks': ["https://example.com/v/1", {'url': "https://example.com/fail"}],
+                                                   'defaults': {'quality_idx': 2}})
+    assert r.status_code == 202
+    ok_id, fail_id = r.get_json()['task_ids']
+    done = wait_for(lambda: task_status(client, ok_id, "done"))
+    assert done['progress'] == 100.0
+    assert done['params']['quality_idx'] == 2
+    assert wait_for(lambda: task_status(client, fail_id, "failed"))['error'] == "解析失败"
+    assert client.get("/tasks/nope", headers=AUTH).status_code == 404
+    listed = client.get("/tasks?status=done", headers=AUTH).get_json()
+    assert [t['id'] for t in listed['tasks']] == [ok_id]
+
+def test_post_tasks_validation(client):
+    assert client.post("/tasks", headers=AUTH, json={'url': "ftp://x"}).status_code == 400
+    assert client.post("/tasks", headers=AUTH, json=[{'url': "https://example.com/v/1", 'quality_idx': True}]).status_code == 400
+    assert client.post("/tasks", headers=AUTH, json="nope").status_code == 400
+
+def test_event_stream(client, monkeypatch):
+    monkeypatch.setattr(api_server, "SSE_HEARTBEAT", 0.1)
+    resp = client.get(f"/events?token={TOKEN}", buffered=False)
+    assert resp.mimetype == "text/event-stream"
+    task_id = client.post("/tasks", headers=AUTH, json=["https://example.com/v/2"]).get_json()['task_ids'][0]
+    events, deadline = [], time.time() + 5
+    for chunk in resp.response:
+        for block in chunk.decode().split("\n\n"):
+            lines = dict(l.split(": ", 1) for l in block.splitlines() if l.startswith(("event:", "data:")))
+            if lines.get('event') and json.loads(lines['data']).get('task_id') == task_id: events.append(lines['event'])
+        if "task_finished" in events or time.time() > deadline: break
+    resp.close()
+    assert events[0] == "task_queued" and events[-1] == "task_finished"
+    assert {"task_started", "progress", "status"} <= set(events)
+
+def test_cancel_task(client):
+    task_id = client.post("/tasks", headers=AUTH, json=["https://example.com/slow/1"]).get_json()['task_ids'][0]
+    wait_for(lambda: task_status(client, task_id, "running"))
+    assert client.delete(f"/tasks/{task_id}", headers=AUTH).status_code == 202
+    task = wait_for(lambda: task_status(client, task_id, "failed"))
+    assert task['error'] == core_worker.CANCELLED
+    assert client.delete(f"/tasks/{task_id}", headers=AUTH).status_code == 409
+    assert client.delete("/tasks/nope", headers=AUTH).status_code == 404
+
+def test_resolved_playlist_entries(worker, monkeypatch):
+    added = []
+    monkeypatch.setattr(worker, "add_tasks", lambda items, dedupe=False: added.extend(items) or [])
+    parent = {'task_id': "parent", 'url': "https://example.com/page", 'host': "example.com", 'quality_idx': 0, 'playlist': True}
+    info = {'_type': 'playlist', 'entries': [
+        {'id': "a", 'extractor_key': "Generic", 'formats': [{'url': "https://cdn.example.com/a.mp4"}]},
+        {'_type': 'url', 'url': "https://example.com/v/3", 'ie_key': "Generic", 'id': "3"},
+        {'_type': 'url', 'id': "4"}]}
+    # 已解析、没有独立链接的条目以父链接 + 序号入队；既无链接又未解析的条目让父任务失败
+    with pytest.raises(Exception, match="1 项缺少链接"):
+        worker._enqueue_entries(parent, info)
+    assert [(c['url'], c.get('playlist_items'), c['key']) for c in added] == [
+        ("https://example.com/page", "1", "generic a"), ("https://example.com/v/3", None, "generic 3")]
+    assert not added[0]['playlist'] and added[0]['parent'] == "parent"
+    assert worker._build_opts(worker._normalize(added[0]))['playlist_items'] == "1"
+
+def test_direct_submission_has_key(worker, monkeypatch):
+    url = "https://www.youtube.com/watch?v=abcdefghijk"
+    monkeypatch.setattr(worker, "_extract", lambda params, cookie_file=None: pytest.fail("命中下载记录时不应解析"))
+    assert worker._normalize(url)['key'] == "youtube abcdefghijk"
+    # 展开时已算好的键 (可能为 None) 原样保留，不按链接重新推算
+    assert worker._normalize({'url': url, 'key': None})['key'] is None
+    worker.archive.add("youtube abcdefghijk")
+    assert worker.resolve_robust(worker._normalize(url)) == (True, None)
+
+def test_progress_during_encode(client):
+    task_id = client.post("/tasks", headers=AUTH, json=["https://example.com/encode/1"]).get_json()['task_ids'][0]
+    # 下载已到 100%，编码阶段查询到的是编码进度
+    assert wait_for(lambda: client.get(f"/tasks/{task_id}", headers=AUTH).get_json()['progress'] == 40.0)
+
+def test_cancel_before_post_job(client, worker):
+    params = worker._normalize("https://example.com/v/9")
+    worker.store.add_many([params])
+    with worker._cond: worker._cancelled.add(params['task_id'])
+    # 排队等编码期间已取消: 不再运行后处理作业，任务以取消结束
+    worker._submit_post(params, "out.mp4", lambda: pytest.fail("已取消的任务不应开始编码"))
+    assert wait_for(lambda: task_status(client, params['task_id'], "failed"))['error'] == core_worker.CANCELLED
@@ -0,0 +1,153 @@
+""" 分块下载 / 远程 zip / FFmpeg 安装测试: 本地 http.server 提供 Range 响应与压缩包夹具，不访问外网 """
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+pytest.importorskip("requests")
+
+from master_studio import utils
+from master_studio.downloader import ChecksumError, ChunkedDownloader, HttpRangeFile, RangeNotSupported, fetch_sha256
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        body = srv.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        rng = self.headers.get('Range')
+        if rng and srv.ranges:
+            start, _, end = rng.split("=", 1)[1].partition("-")
+            start, end = int(start), min(int(end) if end else len(body) - 1, len(body) - 1)
+            if srv.fail_from is not None and start >= srv.fail_from > 0:
+                self.send_error(500)
+                return
+            data = body[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(body)}")
+        else:
+            data = body
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        with srv.lock: srv.served += len(data)
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    srv.files, srv.ranges, srv.fail_from, srv.served, srv.lock = {}, True, None, 0, threading.Lock()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def test_chunked_resume(server, tmp_path):
+    body = os.urandom(1024 * 1024)
+    server.files["/f.bin"] = body
+    dest = str(tmp_path / "f.bin")
+    # 后半部分的块全部失败: 第一次运行中断，只留下前半部分的块
+    server.fail_from = len(body) // 2
+    with pytest.raises(Exception):
+        ChunkedDownloader(server.url + "/f.bin", dest, sha256=sha256(body), connections=4, chunk_size=64 * 1024, retries=0).run()
+    assert not os.path.exists(dest)
+    assert os.path.exists(dest + ".part.json")
+
+    server.fail_from, server.served = None, 0
+    ChunkedDownloader(server.url + "/f.bin", dest, sha256=sha256(body), connections=4, chunk_size=64 * 1024, retries=0).run()
+    with open(dest, 'rb') as f: assert f.read() == body
+    # 续传只补齐缺失的块
+    assert server.served <= len(body) // 2 + 1
+    assert not os.path.exists(dest + ".part") and not os.path.exists(dest + ".part.json")
+
+def test_checksum_mismatch_discards_part(server, tmp_path):
+    server.files["/f.bin"] = os.urandom(200 * 1024)
+    dest = str(tmp_path / "f.bin")
+    with pytest.raises(ChecksumError):
+        ChunkedDownloader(server.url + "/f.bin", dest, sha256="0" * 64, chunk_size=64 * 1024).run()
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + ".part") and not os.path.exists(dest + ".part.json")
+
+def test_without_range_support(server, tmp_path):
+    body = os.urandom(100 * 1024)
+    server.files["/f.bin"] = body
+    server.ranges = False
+    dest = str(tmp_path / "f.bin")
+    ChunkedDownloader(server.url + "/f.bin", dest, sha256=sha256(body), chunk_size=16 * 1024).run()
+    with open(dest, 'rb') as f: assert f.read() == body
+    with pytest.raises(RangeNotSupported):
+        HttpRangeFile(server.url + "/f.bin")
+
+def make_ffmpeg_zip():
+    """ 与 gyan.dev 发布包相同的目录结构，另带一个大文件，验证流式解压不会下载它 """
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ffmpeg-7.0-essentials_build/doc/big.bin", os.urandom(2 * 1024 * 1024))
+        z.writestr("ffmpeg-7.0-essentials_build/bin/ffmpeg.exe", b"ffmpeg" * 10000)
+        z.writestr("ffmpeg-7.0-essentials_build/bin/ffprobe.exe", b"ffprobe" * 10000)
+    return buf.getvalue()
+
+def test_http_range_file_reads_only_needed_members(server):
+    body = make_ffmpeg_zip()
+    server.files["/ffmpeg.zip"] = body
+    remote = HttpRangeFile(server.url + "/ffmpeg.zip", block_size=64 * 1024)
+    with zipfile.ZipFile(remote) as z:
+        assert z.read("ffmpeg-7.0-essentials_build/bin/ffmpeg.exe") == b"ffmpeg" * 10000
+    assert remote.fetched < len(body) // 4
+
+def test_fetch_sha256(server):
+    server.files["/f.sha256"] = ("AB" * 32 + "  f.zip\n").encode()
+    assert fetch_sha256(server.url + "/f.sha256") == "ab" * 32
+    server.files["/bad.sha256"] = b"not a hash"
+    with pytest.raises(ChecksumError):
+        fetch_sha256(server.url + "/bad.sha256")
+
+@pytest.fixture
+def install(server, tmp_path, monkeypatch):
+    body = make_ffmpeg_zip()
+    server.files["/ffmpeg.zip"] = body
+    server.files["/ffmpeg.zip.sha256"] = sha256(body).encode()
+    monkeypatch.setattr(utils, "BIN_DIR", str(tmp_path))
+    monkeypatch.setattr(utils.DependencyManager, "FFMPEG_URL", server.url + "/ffmpeg.zip")
+    monkeypatch.setattr(utils.DependencyManager, "FFMPEG_SHA256_URL", server.url + "/ffmpeg.zip.sha256")
+    settings = {}
+    monkeypatch.setattr(utils, "load_settings", lambda: settings)
+    return settings
+
+def test_install_ffmpeg_verified(install, tmp_path):
+    ok, msg = utils.DependencyManager.install_ffmpeg()
+    assert ok, msg
+    assert (tmp_path / "ffmpeg.exe").read_bytes() == b"ffmpeg" * 10000
+    assert (tmp_path / "ffprobe.exe").read_bytes() == b"ffprobe" * 10000
+    assert not (tmp_path / "ffmpeg_temp.zip").exists()
+
+def test_install_ffmpeg_fails_without_manifest(install, server, tmp_path):
+    del server.files["/ffmpeg.zip.sha256"]
+    ok, msg = utils.DependencyManager.install_ffmpeg()
+    assert not ok and "校验清单" in msg
+    assert not (tmp_path / "ffmpeg.exe").exists()
+
+def test_install_ffmpeg_rejects_tampered_zip(install, server, tmp_path):
+    server.files["/ffmpeg.zip.sha256"] = sha256(b"other").encode()
+    ok, msg = utils.DependencyManager.install_ffmpeg()
+    assert not ok and "SHA-256" in msg
+    assert not (tmp_path / "ffmpeg.exe").exists()
+
+def test_install_ffmpeg_streaming_opt_in(install, server, tmp_path):
+    install["ffmpeg_stream_install"] = True
+    ok, msg = utils.DependencyManager.install_ffmpeg()
+    assert ok, msg
+    assert (tmp_path / "ffmpeg.exe").read_bytes() == b"ffmpeg" * 10000
+    # 只取了两个成员，没有下载整个压缩包
+    assert server.served < len(server.files["/ffmpeg.zip"]) // 2